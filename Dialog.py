@@ -36,6 +36,18 @@ class Ui_Dialog(object):
         self.flip_prob_slider.setOrientation(QtCore.Qt.Orientation.Horizontal)
         self.flip_prob_slider.setObjectName("flip_prob_slider")
         self.verticalLayout.addWidget(self.flip_prob_slider)
+        self.computer_checkbox = QtWidgets.QCheckBox(parent=Dialog)
+        self.computer_checkbox.setGeometry(QtCore.QRect(30, 150, 241, 22))
+        self.computer_checkbox.setObjectName("computer_checkbox")
+        self.board_size_text = QtWidgets.QLabel(parent=Dialog)
+        self.board_size_text.setGeometry(QtCore.QRect(30, 185, 91, 22))
+        self.board_size_text.setObjectName("board_size_text")
+        self.board_size_spinbox = QtWidgets.QSpinBox(parent=Dialog)
+        self.board_size_spinbox.setGeometry(QtCore.QRect(130, 185, 71, 22))
+        self.board_size_spinbox.setMinimum(5)
+        self.board_size_spinbox.setMaximum(128)
+        self.board_size_spinbox.setProperty("value", 15)
+        self.board_size_spinbox.setObjectName("board_size_spinbox")
 
         self.retranslateUi(Dialog)
         self.buttonBox.accepted.connect(Dialog.accept) # type: ignore
@@ -47,3 +59,5 @@ class Ui_Dialog(object):
         Dialog.setWindowTitle(_translate("Dialog", "Dialog"))
         self.start_new_game_title.setText(_translate("Dialog", "<html><head/><body><p><span style=\" font-size:18pt;\">Start New Game:</span></p></body></html>"))
         self.flip_prob_text.setText(_translate("Dialog", "Flip Probability: "))
+        self.computer_checkbox.setText(_translate("Dialog", "Computer plays White"))
+        self.board_size_text.setText(_translate("Dialog", "Board size:"))
@@ -88,6 +88,14 @@ class Ui_MainWindow(object):
         self.toggle_real = QtWidgets.QPushButton(parent=self.centralwidget)
         self.toggle_real.setObjectName("toggle_real")
         self.verticalLayout.addWidget(self.toggle_real)
+        self.hint_button = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.hint_button.setObjectName("hint_button")
+        self.verticalLayout.addWidget(self.hint_button)
+        self.hint_label = QtWidgets.QLabel(parent=self.centralwidget)
+        self.hint_label.setText("")
+        self.hint_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.hint_label.setObjectName("hint_label")
+        self.verticalLayout.addWidget(self.hint_label)
         self.game_status = QtWidgets.QLabel(parent=self.centralwidget)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Preferred, QtWidgets.QSizePolicy.Policy.Expanding)
         sizePolicy.setHorizontalStretch(0)
@@ -129,5 +137,6 @@ class Ui_MainWindow(object):
         self.undo_button.setText(_translate("MainWindow", "Undo"))
         self.redo_button.setText(_translate("MainWindow", "Redo"))
         self.toggle_real.setText(_translate("MainWindow", "toggleReal"))
+        self.hint_button.setText(_translate("MainWindow", "Hint"))
         self.game_status.setText(_translate("MainWindow", "Game Status"))
         self.four_in_a_row_warning.setText(_translate("MainWindow", "<html><head/><body><p><span style=\" font-size:16pt; color:#ed333b;\">Four In A Row!</span></p></body></html>"))
@@ -0,0 +1,287 @@
+import math
+import random
+import time
+import typing
+
+from color import Color, otherColor
+from bitboard import runLength, makesFive
+from engine import Game
+from zobrist import zobristKeys, SIDE_TO_MOVE_KEY, TranspositionTable
+from threats import ThreatIndex
+
+WIN_SCORE = 1_000_000
+# score of a five-cell window holding 1..4 stones of one color and none of the other
+WINDOW_WEIGHTS = (0, 1, 8, 64, 512)
+
+# XORed into table keys when the computer plays white, since values are stored from its point of view
+PERSPECTIVE_KEY = random.Random(SIDE_TO_MOVE_KEY).getrandbits(64)
+
+class SearchTimeout(Exception): pass
+
+class ExpectimaxPlayer:
+    # Computer opponent for RandGomoku. Every move is a chance node: with probability 1-flip_prob the
+    # stone lands in the mover's color and with flip_prob in the other color, and a five of either
+    # color ends the game for that color. Decision nodes use alpha-beta with a transposition table;
+    # the search deepens iteratively and always answers within time_budget seconds.
+    #
+    # By default the search starts from the fake board, i.e. what a human player sees; earlier
+    # flips are unknown to it just as they are to the players.
+
+    def __init__(self, time_budget: float = 0.5, max_depth: int = 8, branching: int = 10,
+                 use_real_board: bool = False, tt_capacity: int = 1 << 16):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.branching = branching
+        self.use_real_board = use_real_board
+        self.table = TranspositionTable(tt_capacity)
+        self.last_depth = 0
+        self.last_nodes = 0
+        self.table_flip_prob = None
+
+    def __call__(self, game: Game, rng: random.Random):
+        # lets the player take part in tournament.runTournament
+        return self.chooseMove(game)
+
+    def newGame(self):
+        self.table.clear()
+        self.table_flip_prob = None
+
+    def chooseMove(self, game: Game, should_stop: None|typing.Callable[[], bool] = None) -> tuple[int,int]:
+        # should_stop lets a caller cut the search short; the best move found so far is returned
+        self.setup(game)
+        self.should_stop = should_stop
+        self.deadline = time.perf_counter() + self.time_budget
+        self.nodes = 0
+        self.table.newSearch()
+
+        candidates = self.orderedMoves(game.current_color, None)
+        urgent = self.threatMoves(game.threats if self.use_real_board else game.fake_threats)
+        candidates = urgent + [index for index in candidates if index not in urgent]
+        if not candidates:
+            if self.masks[0] | self.masks[1]:
+                raise ValueError("no empty cell left")
+            center = game.SIZE // 2
+            return center, center
+
+        best = candidates[0]
+        self.last_depth = 0
+        for depth in range(1, self.max_depth+1):
+            try:
+                value, move = self.searchRoot(depth, candidates)
+            except SearchTimeout:
+                break
+            best = move
+            self.last_depth = depth
+            candidates.remove(move)
+            candidates.insert(0, move)
+            if abs(value) >= WIN_SCORE:
+                break
+
+        self.last_nodes = self.nodes
+        return divmod(best, self.width)
+
+    def setup(self, game: Game):
+        board = game.real_board if self.use_real_board else game.fake_board
+        self.me = game.current_color
+        self.flip_prob = game.flip_prob
+        if self.flip_prob != self.table_flip_prob:
+            # stored values depend on the flip probability
+            self.table.clear()
+            self.table_flip_prob = self.flip_prob
+        self.board = board
+        self.size = board.size
+        self.width = board.width
+        self.shifts = board.shifts
+        self.full = board.full
+        self.masks = board.masks[:]
+
+        # windows of five cells that lie inside the board, per direction
+        self.window_starts = []
+        for s in self.shifts:
+            starts = self.full
+            for k in range(1, 5):
+                starts &= self.full >> (k*s)
+            self.window_starts.append(starts)
+
+        keys = zobristKeys(self.size)
+        self.bit_keys = [[0]*(self.size*self.width) for _ in Color]
+        for color in Color:
+            for x in range(self.size):
+                for y in range(self.size):
+                    self.bit_keys[color.value][x*self.width+y] = keys[color.value][x*self.size+y]
+        self.hash = 0
+        for color in Color:
+            mask = self.masks[color.value]
+            while mask:
+                low = mask & -mask
+                self.hash ^= self.bit_keys[color.value][low.bit_length()-1]
+                mask ^= low
+
+    def checkTime(self):
+        self.nodes += 1
+        if time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.should_stop is not None and self.nodes % 64 == 0 and self.should_stop():
+            raise SearchTimeout
+
+    def place(self, index: int, color: Color):
+        self.masks[color.value] |= 1 << index
+        self.hash ^= self.bit_keys[color.value][index]
+
+    def remove(self, index: int, color: Color):
+        self.masks[color.value] &= ~(1 << index)
+        self.hash ^= self.bit_keys[color.value][index]
+
+    def makesFive(self, index: int, color: Color):
+        return makesFive(self.masks[color.value], index, self.shifts)
+
+    def orderedMoves(self, to_move: Color, tt_move: None|int):
+        # empty cells within two steps of a stone, most promising first
+        occupied = self.masks[0] | self.masks[1]
+        candidates = self.board.neighborhood(occupied, 2) & ~occupied
+
+        own = self.masks[to_move.value]
+        opponent = self.masks[otherColor(to_move).value]
+        scored = []
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            index = low.bit_length() - 1
+            priority = 0
+            for s in self.shifts:
+                own_run = min(runLength(own, index, s), 4)
+                opponent_run = min(runLength(opponent, index, s), 4)
+                priority += 5**own_run + 4**opponent_run
+            if index == tt_move:
+                priority = math.inf
+            scored.append((priority, index))
+
+        scored.sort(reverse=True)
+        return [index for _, index in scored]
+
+    def threatMoves(self, threats: ThreatIndex):
+        # cells that must be looked at first: winning cells, cells blocking the opponent's fours,
+        # then cells turning open threes into open fours, ours before theirs
+        opponent = otherColor(self.me)
+        moves: list[int] = []
+        for cells in (threats.fourCells(self.me), threats.fourCells(opponent),
+                      threats.openThreeCells(self.me), threats.openThreeCells(opponent)):
+            for x, y in sorted(cells):
+                index = x*self.width + y
+                if index not in moves:
+                    moves.append(index)
+        return moves
+
+    def windowScore(self, own: int, opponent: int):
+        score = 0
+        for s, starts in zip(self.shifts, self.window_starts):
+            # bit-sliced 3-bit counter of own stones in the window starting at each cell
+            b0 = b1 = b2 = 0
+            blocked = 0
+            for k in range(5):
+                m = own >> (k*s)
+                carry = b0 & m
+                b0 ^= m
+                b2 |= b1 & carry
+                b1 ^= carry
+                blocked |= opponent >> (k*s)
+            free = starts & ~blocked
+            score += (WINDOW_WEIGHTS[1] * (free & ~b2 & ~b1 & b0).bit_count()
+                      + WINDOW_WEIGHTS[2] * (free & ~b2 & b1 & ~b0).bit_count()
+                      + WINDOW_WEIGHTS[3] * (free & ~b2 & b1 & b0).bit_count()
+                      + WINDOW_WEIGHTS[4] * (free & b2 & ~b1 & ~b0).bit_count())
+        return score
+
+    def evaluate(self, to_move: Color):
+        mine = self.masks[self.me.value]
+        theirs = self.masks[otherColor(self.me).value]
+        value = self.windowScore(mine, theirs) - self.windowScore(theirs, mine)
+        # the side to move is a tempo ahead
+        return value + (4 if to_move == self.me else -4)
+
+    def searchRoot(self, depth: int, candidates: list[int]):
+        alpha, best_move = -math.inf, candidates[0]
+        for index in candidates[:2*self.branching]:
+            value = self.chance(index, self.me, depth, alpha, math.inf)
+            if value > alpha:
+                alpha, best_move = value, index
+        return alpha, best_move
+
+    def chance(self, index: int, to_move: Color, depth: int, alpha: float, beta: float):
+        outcomes = [(to_move, 1-self.flip_prob), (otherColor(to_move), self.flip_prob)]
+        if self.flip_prob == 0:
+            outcomes.pop()
+        elif self.flip_prob == 1:
+            outcomes.pop(0)
+        if len(outcomes) > 1:
+            # bounds cannot be passed through a weighted average
+            alpha, beta = -math.inf, math.inf
+
+        value = 0.0
+        for color, prob in outcomes:
+            self.place(index, color)
+            try:
+                if self.makesFive(index, color):
+                    # prefer quicker wins and slower losses
+                    result = (WIN_SCORE + depth) if color == self.me else -(WIN_SCORE + depth)
+                else:
+                    result = self.decision(depth-1, alpha, beta, otherColor(to_move))
+            finally:
+                self.remove(index, color)
+            value += prob*result
+        return value
+
+    def decision(self, depth: int, alpha: float, beta: float, to_move: Color):
+        self.checkTime()
+
+        key = self.hash
+        if to_move == Color.WHITE:
+            key ^= SIDE_TO_MOVE_KEY
+        if self.me == Color.WHITE:
+            key ^= PERSPECTIVE_KEY
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry.move
+            if entry.depth >= depth:
+                if entry.flag == TranspositionTable.EXACT:
+                    return entry.value
+                if entry.flag == TranspositionTable.LOWER_BOUND and entry.value >= beta:
+                    return entry.value
+                if entry.flag == TranspositionTable.UPPER_BOUND and entry.value <= alpha:
+                    return entry.value
+
+        if depth == 0:
+            value = self.evaluate(to_move)
+            self.table.store(key, 0, value, TranspositionTable.EXACT)
+            return value
+
+        moves = self.orderedMoves(to_move, tt_move)[:self.branching]
+        if not moves:
+            return 0.0
+
+        alpha_orig, beta_orig = alpha, beta
+        maximizing = to_move == self.me
+        best = -math.inf if maximizing else math.inf
+        best_move = moves[0]
+        for index in moves:
+            value = self.chance(index, to_move, depth, alpha, beta)
+            if maximizing:
+                if value > best:
+                    best, best_move = value, index
+                alpha = max(alpha, value)
+            else:
+                if value < best:
+                    best, best_move = value, index
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best <= alpha_orig:
+            flag = TranspositionTable.UPPER_BOUND
+        elif best >= beta_orig:
+            flag = TranspositionTable.LOWER_BOUND
+        else:
+            flag = TranspositionTable.EXACT
+        self.table.store(key, depth, best, flag, best_move)
+        return best
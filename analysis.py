@@ -0,0 +1,35 @@
+import typing
+
+from engine import Game
+
+# Jobs run by the GUI's background engine worker. They only depend on the engine, so they can run
+# in a separate process; each gets a snapshot of the game and a should_stop predicate that turns
+# true once the request has gone stale. The players are imported by the jobs, so the GUI process
+# never loads them. Positions found in the opening book at book_path are answered from it without
+# searching.
+
+def bookMove(game: Game, book_path: None|str):
+    if book_path is None:
+        return None
+    from book import openBook, BookFormatError
+    try:
+        return openBook(book_path).bestMove(game)
+    except (OSError, BookFormatError):
+        return None
+
+def computerMove(game: Game, time_budget: float, book_path: None|str, should_stop: typing.Callable[[], bool]):
+    move = bookMove(game, book_path)
+    if move is not None:
+        return move.x, move.y
+    from ai import ExpectimaxPlayer
+    return ExpectimaxPlayer(time_budget).chooseMove(game, should_stop)
+
+def hint(game: Game, time_budget: float, book_path: None|str, should_stop: typing.Callable[[], bool]):
+    # suggested move for the side to move and its estimated chance of winning after it
+    move = bookMove(game, book_path)
+    if move is not None:
+        return (move.x, move.y), move.score
+    from mcts import MCTSPlayer
+    player = MCTSPlayer(time_budget)
+    move = player.chooseMove(game, should_stop)
+    return move, player.last_win_rate
@@ -0,0 +1,83 @@
+import typing
+
+import numpy as np
+
+from color import Color
+
+# cell values in the batch boards; stones are Color.value + 1 so that 0 means empty
+EMPTY = 0
+BLACK = Color.BLACK.value + 1
+WHITE = Color.WHITE.value + 1
+# winner value for games that are still running or ended with a full board
+NO_WINNER = -1
+
+class BatchResult(typing.NamedTuple):
+    winners: np.ndarray      # (N,) Color.value of the real winner, or NO_WINNER
+    move_counts: np.ndarray  # (N,) number of moves played in each game
+
+def fiveInARow(mask: np.ndarray):
+    # mask is (N, size, size) bool; returns (N,) bool, true where some line of five is set
+    a = mask
+    found = (a[:, :-4, :] & a[:, 1:-3, :] & a[:, 2:-2, :] & a[:, 3:-1, :] & a[:, 4:, :]).any(axis=(1, 2))
+    found |= (a[:, :, :-4] & a[:, :, 1:-3] & a[:, :, 2:-2] & a[:, :, 3:-1] & a[:, :, 4:]).any(axis=(1, 2))
+    found |= (a[:, :-4, :-4] & a[:, 1:-3, 1:-3] & a[:, 2:-2, 2:-2] & a[:, 3:-1, 3:-1] & a[:, 4:, 4:]).any(axis=(1, 2))
+    found |= (a[:, :-4, 4:] & a[:, 1:-3, 3:-1] & a[:, 2:-2, 2:-2] & a[:, 3:-1, 1:-3] & a[:, 4:, :-4]).any(axis=(1, 2))
+    return found
+
+def randomPolicy(sim: "BatchSimulator"):
+    # uniformly random empty cell on every board
+    keys = sim.rng.random(sim.real.shape[0:1] + (sim.size*sim.size,))
+    keys[sim.real.reshape(len(keys), -1) != EMPTY] = -1.0
+    return keys.argmax(axis=1)
+
+class BatchSimulator:
+    # N independent RandGomoku games stepped together, following the same rules as engine.Game
+
+    def __init__(self, n_games: int, flip_prob: float|np.ndarray = 0.1, size: int = 15, seed: None|int = None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.flip_prob = np.broadcast_to(np.asarray(flip_prob, dtype=np.float64), (n_games,))
+        self.real = np.zeros((n_games, size, size), dtype=np.int8)
+        self.fake = np.zeros((n_games, size, size), dtype=np.int8)
+        self.current = np.full(n_games, BLACK, dtype=np.int8)
+        self.winners = np.full(n_games, NO_WINNER, dtype=np.int8)
+        self.move_counts = np.zeros(n_games, dtype=np.int32)
+        self.active = np.ones(n_games, dtype=bool)
+
+    def step(self, cells: np.ndarray):
+        # cells holds one flat cell index per board; entries for finished games are ignored
+        games = np.flatnonzero(self.active)
+        if len(games) == 0:
+            return
+
+        cells = np.asarray(cells)[games]
+        x, y = np.divmod(cells, self.size)
+        if (self.real[games, x, y] != EMPTY).any():
+            raise ValueError("move on an occupied cell")
+
+        fake_color = self.current[games]
+        flipped = self.rng.random(len(games)) < self.flip_prob[games]
+        real_color = np.where(flipped, BLACK + WHITE - fake_color, fake_color).astype(np.int8)
+
+        self.fake[games, x, y] = fake_color
+        self.real[games, x, y] = real_color
+        self.move_counts[games] += 1
+
+        won = fiveInARow(self.real[games] == real_color[:, None, None])
+        self.winners[games[won]] = real_color[won] - 1
+        full = self.move_counts[games] == self.size*self.size
+        self.active[games[won | full]] = False
+
+        # like engine.Game, the side to move only changes when the game goes on
+        going = games[~won]
+        self.current[going] = BLACK + WHITE - self.current[going]
+
+    def run(self, policy: typing.Callable[["BatchSimulator"], np.ndarray] = randomPolicy, max_moves: None|int = None):
+        limit = self.size*self.size if max_moves is None else max_moves
+        while self.active.any() and self.move_counts.max() < limit:
+            self.step(policy(self))
+        return BatchResult(self.winners.copy(), self.move_counts.copy())
+
+def simulate(n_games: int, flip_prob: float|np.ndarray = 0.1, size: int = 15, seed: None|int = None,
+             policy: typing.Callable[[BatchSimulator], np.ndarray] = randomPolicy):
+    return BatchSimulator(n_games, flip_prob, size, seed).run(policy)
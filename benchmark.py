@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import typing
+
+from color import Color
+from engine import Game
+
+# Benchmarks for the engine and rendering hot paths. Every case is seeded, so runs on the same
+# machine are comparable; --save writes the medians to a baseline file and --compare reports cases
+# that got slower than the baseline by more than --tolerance.
+
+def longHistory(size: int = Game.SIZE):
+    # A full-board game that never has five in a row: colors follow (x + 2*y) % 4 < 2, which has runs
+    # of at most two in every direction. Black and white cells are interleaved to alternate turns.
+    black = [(x, y) for x in range(size) for y in range(size) if (x + 2*y) % 4 < 2]
+    white = [(x, y) for x in range(size) for y in range(size) if (x + 2*y) % 4 >= 2]
+    rng = random.Random(1)
+    rng.shuffle(black)
+    rng.shuffle(white)
+    moves = []
+    for (bx, by), (wx, wy) in zip(black, white):
+        moves.append((bx, by, Color.BLACK, Color.BLACK))
+        moves.append((wx, wy, Color.WHITE, Color.WHITE))
+    return moves
+
+def randomGameMoves(seed: int):
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(Game.SIZE) for y in range(Game.SIZE)]
+    rng.shuffle(cells)
+    return cells
+
+def benchPlay():
+    # one full random game of play() calls
+    for seed in range(5):
+        game = Game(seed)
+        game.flip_prob = 0.1
+        for x, y in randomGameMoves(seed):
+            if game.winner:
+                break
+            game.play(x, y)
+
+def loadedGame():
+    game = Game(0)
+    game.load(longHistory(), 0.0, 0)
+    return game
+
+def benchCheckForWin(game: Game):
+    for x, y, _, _ in game.history:
+        game.checkForWin(x, y)
+
+def benchCheckForFourInARow(game: Game):
+    for _ in range(1000):
+        game.checkForFourInARow()
+
+def benchGotoMove(game: Game):
+    game.gotoMove(0)
+    game.gotoMove(len(game.history))
+    for move in range(0, len(game.history), 7):
+        game.gotoMove(move)
+
+class Case(typing.NamedTuple):
+    name: str
+    run: typing.Callable[[], None]
+
+def engineCases():
+    game = loadedGame()
+    return [
+        Case("engine.play", benchPlay),
+        Case("engine.checkForWin", lambda: benchCheckForWin(game)),
+        Case("engine.checkForFourInARow", lambda: benchCheckForFourInARow(game)),
+        Case("engine.gotoMove", lambda: benchGotoMove(game)),
+    ]
+
+_qt_objects: list = []
+
+def renderingCases():
+    # needs PyQt5; runs on the offscreen platform unless QT_QPA_PLATFORM says otherwise
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5 import QtWidgets
+    import main
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    view = QtWidgets.QGraphicsView()
+    board_manager = main.BoardManager(view)
+    board_manager.game.load(longHistory(), 0.0, 0)
+    board_manager.game.emitBoardChangedSignals()
+
+    def refreshAcrossHistory():
+        game = board_manager.game
+        for move in (0, len(game.history), len(game.history)//2, len(game.history)):
+            game.gotoMove(move)
+            game.emitBoardChangedSignals()
+
+    def toggleReal():
+        for _ in range(10):
+            board_manager.showing_real = not board_manager.showing_real
+            board_manager.refresh_piece_items()
+
+    app.processEvents()
+    # the application owns the widgets and must outlive this function
+    _qt_objects.extend((app, view, board_manager))
+    return [
+        Case("board.refresh_piece_items", refreshAcrossHistory),
+        Case("board.toggle_real", toggleReal),
+    ]
+
+def measure(case: Case, repeat: int):
+    case.run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="RandGomoku benchmarks")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--no-rendering", action="store_true", help="skip the Qt rendering cases")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    cases = engineCases()
+    if not args.no_rendering:
+        try:
+            cases += renderingCases()
+        except ImportError as error:
+            print(f"skipping rendering cases: {error}", file=sys.stderr)
+
+    results: dict[str, float] = {}
+    for case in cases:
+        if args.filter in case.name:
+            results[case.name] = measure(case, args.repeat)
+            print(f"{case.name:32} {results[case.name]*1000:10.3f} ms")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"python": sys.version.split()[0], "results": results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = [name for name, seconds in results.items()
+                       if name in baseline and seconds > baseline[name] * (1 + args.tolerance)]
+        for name in regressions:
+            print(f"regression: {name} {baseline[name]*1000:.3f} ms -> {results[name]*1000:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import typing
+
+from color import Color
+
+class BitBoard:
+    # One integer mask per color. Cell (x,y) is bit x*(size+1)+y; the extra column at the end of
+    # every row is always empty, so shifting a mask never wraps a line into the next row.
+    # Single cells are looked up in a dict of the occupied cells, so get() costs the same however
+    # large the board is.
+
+    def __init__(self, size: int):
+        self.size = size
+        self.width = size + 1
+        self.masks = [0, 0]
+        self.colors: dict[int, Color] = {}
+        self.full = 0
+        for x in range(size):
+            self.full |= ((1 << size) - 1) << (x*self.width)
+        # shifts for the directions (1,0), (0,1), (1,1), (1,-1)
+        self.shifts = (self.width, 1, self.width+1, self.width-1)
+
+    def copy(self):
+        board = BitBoard.__new__(BitBoard)
+        board.size = self.size
+        board.width = self.width
+        board.masks = self.masks[:]
+        board.colors = self.colors.copy()
+        board.full = self.full
+        board.shifts = self.shifts
+        return board
+
+    def index(self, x: int, y: int):
+        return x*self.width + y
+
+    def coords(self, index: int):
+        return divmod(index, self.width)
+
+    def get(self, x: int, y: int) -> None|Color:
+        return self.colors.get(x*self.width + y)
+
+    def set(self, x: int, y: int, color: None|Color):
+        index = x*self.width + y
+        old = self.colors.pop(index, None)
+        if old is not None:
+            self.masks[old.value] ^= 1 << index
+        if color is not None:
+            self.masks[color.value] |= 1 << index
+            self.colors[index] = color
+
+    def stones(self, color: Color):
+        return self.masks[color.value]
+
+    def empty(self):
+        return self.full & ~(self.masks[0] | self.masks[1])
+
+    def fiveMask(self, color: Color):
+        # cells that start five stones of color in a row, in any direction
+        b = self.masks[color.value]
+        result = 0
+        for s in self.shifts:
+            result |= b & (b >> s) & (b >> 2*s) & (b >> 3*s) & (b >> 4*s)
+        return result
+
+    def hasFive(self, color: Color):
+        return self.fiveMask(color) != 0
+
+    def fourMask(self, color: Color):
+        # empty cells that would give color five in a row, i.e. complete a four such as XXXX_ or XX_XX
+        b = self.masks[color.value]
+        empty = self.empty()
+        result = 0
+        for s in self.shifts:
+            shifted = [b >> k*s for k in range(5)]
+            for gap in range(5):
+                starts = -1
+                for k in range(5):
+                    if k != gap:
+                        starts &= shifted[k]
+                result |= (starts << gap*s) & empty
+        return result
+
+    def hasFour(self):
+        return self.fourMask(Color.BLACK) != 0 or self.fourMask(Color.WHITE) != 0
+
+    def neighborhood(self, mask: int, steps: int):
+        # cells within steps king moves of a cell in mask (including mask itself)
+        for _ in range(steps):
+            grown = mask
+            for s in self.shifts:
+                grown |= (mask << s) | (mask >> s)
+            mask = grown & self.full
+        return mask
+
+    def cells(self, mask: int) -> typing.Iterator[tuple[int,int]]:
+        while mask:
+            low = mask & -mask
+            yield divmod(low.bit_length()-1, self.width)
+            mask ^= low
+
+def runLength(mask: int, index: int, shift: int):
+    # stones of mask in a row through bit index along shift, not counting index itself
+    count = 0
+    i = index + shift
+    while (mask >> i) & 1:
+        count += 1
+        i += shift
+    i = index - shift
+    while i >= 0 and (mask >> i) & 1:
+        count += 1
+        i -= shift
+    return count
+
+def makesFive(mask: int, index: int, shifts: typing.Iterable[int]):
+    # whether the stone at bit index is part of five or more in a row of mask
+    return any(runLength(mask, index, s) >= 4 for s in shifts)
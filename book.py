@@ -0,0 +1,206 @@
+import argparse
+import functools
+import mmap
+import os
+import struct
+import typing
+
+from color import Color
+from bitboard import BitBoard
+from engine import Game
+from history import MoveHistory
+import record
+from zobrist import symmetries, inverseSymmetries, symmetricZobristKeys, SIDE_TO_MOVE_KEY
+
+# Opening book built from record files. Every position of the first plies of every game is keyed
+# by Game.canonicalKey, so the eight symmetric images of a position share their statistics, and
+# by flip_prob rounded to FLIP_BUCKETS, since what is worth playing depends on how often stones
+# flip. Each (position, flip bucket, move) gets the wins, losses and draws of the player who made
+# the move, with the move written in the frame of the canonical image.
+#
+# The book file is MAGIC, HEADER and then ENTRY records sorted by (key, flip bucket, cell), so a
+# lookup is a binary search on a read-only memory map: opening a book reads nothing up front and
+# any number of processes share its pages.
+
+MAGIC = b"RGMKBOOK"
+HEADER = struct.Struct("<HHI")      # board size, plies per game, number of entries
+ENTRY = struct.Struct("<QHHIII")    # key, flip bucket, cell, wins, losses, draws
+FLIP_BUCKETS = 100
+DEFAULT_PLIES = 12
+# moves seen in fewer games than this are not played from the book
+MIN_GAMES = 3
+
+class BookFormatError(Exception): pass
+
+def flipBucket(flip_prob: float):
+    return round(min(max(flip_prob, 0.0), 1.0) * FLIP_BUCKETS)
+
+def recordedWinner(moves: MoveHistory) -> None|Color:
+    # record files do not store the winner; a game that ended did so with its last move
+    if not len(moves):
+        return None
+    board = BitBoard(moves.size)
+    for x, y, real_color, _ in moves:
+        board.set(x, y, real_color)
+    color = moves[-1][2]
+    return color if board.hasFive(color) else None
+
+class BookMove(typing.NamedTuple):
+    x: int
+    y: int
+    wins: int
+    losses: int
+    draws: int
+
+    @property
+    def games(self):
+        return self.wins + self.losses + self.draws
+
+    @property
+    def score(self):
+        # share of the points won by the player making the move, draws counting half
+        return (self.wins + self.draws/2) / self.games if self.games else 0.0
+
+class BookBuilder:
+    # Collects the statistics of games of one board size in memory; write() stores them.
+
+    def __init__(self, size: int = Game.SIZE, plies: int = DEFAULT_PLIES):
+        self.size = size
+        self.plies = plies
+        self.stats: dict[tuple[int,int,int], list[int]] = {}
+        self.games = 0
+
+    def addGame(self, moves: MoveHistory, flip_prob: float):
+        # returns whether the game was used; games on other board sizes are not
+        if moves.size != self.size:
+            return False
+        keys = symmetricZobristKeys(self.size)
+        permutations = symmetries(self.size)
+        bucket = flipBucket(flip_prob)
+        winner = recordedWinner(moves)
+        hashes = [0] * len(keys)
+
+        for ply, code in enumerate(moves.codes):
+            if ply >= self.plies:
+                break
+            cell, fake = code >> 2, code & 1
+            # the same key as Game.canonicalKey before the move, the mover's fake color being the
+            # side to move
+            h = min(hashes)
+            key = h ^ SIDE_TO_MOVE_KEY if fake == Color.WHITE.value else h
+            # symmetric positions have several minimal images; the smallest cell among them
+            # makes equivalent moves count as one
+            move = min(permutations[t][cell] for t, image in enumerate(hashes) if image == h)
+
+            entry = self.stats.get((key, bucket, move))
+            if entry is None:
+                entry = self.stats[(key, bucket, move)] = [0, 0, 0]
+            if winner is None:
+                entry[2] += 1
+            elif winner.value == fake:
+                entry[0] += 1
+            else:
+                entry[1] += 1
+
+            for t, color_keys in enumerate(keys):
+                hashes[t] ^= color_keys[fake][cell]
+
+        self.games += 1
+        return True
+
+    def addRecords(self, path: str):
+        # streams the games of a record file; returns how many were used
+        used = 0
+        for game in record.readGames(path):
+            used += self.addGame(game.moves, game.flip_prob)
+        return used
+
+    def write(self, path: str, min_games: int = 1):
+        entries = sorted((key, bucket, cell, *entry) for (key, bucket, cell), entry in self.stats.items()
+                         if sum(entry) >= min_games)
+        # write then rename, so a process with the book open never sees half a file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(MAGIC)
+            file.write(HEADER.pack(self.size, self.plies, len(entries)))
+            for entry in entries:
+                file.write(ENTRY.pack(*entry))
+        os.replace(temporary, path)
+        return len(entries)
+
+class OpeningBook:
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            try:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise BookFormatError(f"{path} is empty")
+        if self.data[:len(MAGIC)] != MAGIC or len(self.data) < len(MAGIC) + HEADER.size:
+            raise BookFormatError(f"{path} is not a RandGomoku opening book")
+        self.size, self.plies, self.count = HEADER.unpack_from(self.data, len(MAGIC))
+        self.offset = len(MAGIC) + HEADER.size
+        if len(self.data) < self.offset + self.count*ENTRY.size:
+            raise BookFormatError("truncated opening book")
+
+    def close(self):
+        self.data.close()
+
+    def entry(self, index: int):
+        return ENTRY.unpack_from(self.data, self.offset + index*ENTRY.size)
+
+    def entries(self, key: int, bucket: int) -> typing.Iterator[tuple[int,int,int,int]]:
+        # (cell, wins, losses, draws) of every move stored for the position
+        low, high = 0, self.count
+        while low < high:
+            middle = (low+high) // 2
+            if self.entry(middle)[:2] < (key, bucket):
+                low = middle + 1
+            else:
+                high = middle
+        for index in range(low, self.count):
+            entry_key, entry_bucket, cell, wins, losses, draws = self.entry(index)
+            if (entry_key, entry_bucket) != (key, bucket):
+                return
+            yield cell, wins, losses, draws
+
+    def moves(self, game: Game) -> list[BookMove]:
+        # the book's moves for the side to move, on the game's own board
+        if game.SIZE != self.size or game.winner is not None or game.history_pointer >= self.plies:
+            return []
+        key, transform = game.canonicalKey()
+        inverse = inverseSymmetries(self.size)[transform]
+        result = []
+        for cell, wins, losses, draws in self.entries(key, flipBucket(game.flip_prob)):
+            x, y = divmod(inverse[cell], self.size)
+            # a hash collision could suggest an occupied cell
+            if game.fake_board.get(x, y) is None:
+                result.append(BookMove(x, y, wins, losses, draws))
+        return result
+
+    def bestMove(self, game: Game, min_games: int = MIN_GAMES) -> None|BookMove:
+        moves = [move for move in self.moves(game) if move.games >= min_games]
+        return max(moves, key=lambda move: (move.score, move.games), default=None)
+
+@functools.lru_cache(maxsize=4)
+def openBook(path: str):
+    # one shared instance per path and process, e.g. for the jobs of analysis.py
+    return OpeningBook(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a RandGomoku opening book from record files")
+    parser.add_argument("output", help="book file to write")
+    parser.add_argument("records", nargs="+", help="record files to read")
+    parser.add_argument("--size", type=int, default=Game.SIZE, help="board size; games on other sizes are skipped")
+    parser.add_argument("--plies", type=int, default=DEFAULT_PLIES, help="moves per game to take into the book")
+    parser.add_argument("--min-games", type=int, default=1, help="leave out moves seen in fewer games")
+    args = parser.parse_args()
+
+    builder = BookBuilder(args.size, args.plies)
+    for path in args.records:
+        used = builder.addRecords(path)
+        print(f"{path}: {used} games")
+    count = builder.write(args.output, args.min_games)
+    print(f"{args.output}: {count} entries from {builder.games} games")
+
+if __name__ == "__main__":
+    main()
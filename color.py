@@ -0,0 +1,11 @@
+from enum import Enum
+
+class Color(Enum):
+    BLACK = 0
+    WHITE = 1
+
+def otherColor(color: Color):
+    if color == Color.BLACK:
+        return Color.WHITE
+    else:
+        return Color.BLACK
@@ -0,0 +1,329 @@
+import typing
+import random
+
+from color import Color, otherColor
+from bitboard import BitBoard, makesFive
+from threats import ThreatIndex
+from variations import Variation, commonAncestor
+from history import MoveHistory, encodeMove
+from zobrist import zobristKeys, symmetricZobristKeys, SIDE_TO_MOVE_KEY
+
+class DuplicatePositionError(Exception): pass
+class GameAlreadyEndedError(Exception): pass
+
+class Game:
+    # default board size; each game has its own SIZE
+    SIZE = 15
+
+    def __init__(self, seed: None|int = None, size: int = SIZE):
+        if size < 1:
+            raise ValueError("board size must be positive")
+        self.SIZE = size
+        # every game draws its flips from its own RNG, so a seed reproduces the game exactly
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+        self.listeners: list[typing.Callable[[], None]] = []
+        # history is the current line of the variation tree, line holds its nodes
+        self.history = MoveHistory(self.SIZE)
+        self.history_pointer = 0
+        self.root = Variation()
+        self.line: list[Variation] = []
+        self.current_color = Color.BLACK
+        self.real_board = BitBoard(self.SIZE)
+        self.fake_board = BitBoard(self.SIZE)
+        self.winner: None|Color = None
+        self.flip_prob = 0.1
+        # fours and open threes on each board, kept up to date by setCell
+        self.threats = ThreatIndex(self.real_board)
+        self.fake_threats = ThreatIndex(self.fake_board)
+        # Zobrist hashes of the two boards, kept up to date by setCell
+        self.zobrist_keys = zobristKeys(self.SIZE)
+        self.real_hash = 0
+        self.fake_hash = 0
+        # hashes of the fake board under each of its eight symmetries, for canonicalKey
+        self.symmetric_keys = symmetricZobristKeys(self.SIZE)
+        self.symmetric_hashes = [0] * len(self.symmetric_keys)
+    
+    def pointerAtWin(self):
+        return self.winner is not None and self.history_pointer == len(self.history)
+
+    def copy(self):
+        # independent snapshot of the game without listeners, e.g. to hand to another thread or process
+        game = Game.__new__(Game)
+        game.__dict__.update(self.__dict__)
+        game.listeners = []
+        game.history = self.history.copy()
+        game.symmetric_hashes = list(self.symmetric_hashes)
+        # only the current line, so that the copy never adds to this game's tree
+        game.resetTree()
+        game.real_board = self.real_board.copy()
+        game.fake_board = self.fake_board.copy()
+        game.threats = self.threats.copy(game.real_board)
+        game.fake_threats = self.fake_threats.copy(game.fake_board)
+        game.rng = random.Random()
+        game.rng.setstate(self.rng.getstate())
+        return game
+
+    def __getstate__(self):
+        # The variation tree nests as deep as the history, too deep for pickle; it is rebuilt
+        # from the current line instead. The Zobrist key tables only depend on the size and are
+        # fetched from their caches again, so copies sent to the worker stay small.
+        state = self.__dict__.copy()
+        del state["root"], state["line"], state["zobrist_keys"], state["symmetric_keys"]
+        return state
+
+    def __setstate__(self, state: dict[str, typing.Any]):
+        self.__dict__.update(state)
+        self.zobrist_keys = zobristKeys(self.SIZE)
+        self.symmetric_keys = symmetricZobristKeys(self.SIZE)
+        self.resetTree()
+
+    def currentNode(self):
+        return self.line[self.history_pointer-1] if self.history_pointer else self.root
+
+    def resetTree(self):
+        # makes the current history the only line of a new variation tree
+        self.root = node = Variation()
+        self.line = []
+        for code in self.history.codes:
+            node = node.child(code)
+            self.line.append(node)
+        if self.line:
+            self.line[-1].winner = self.winner
+
+    def positionKey(self, real: bool = False):
+        # hash of the real or fake board together with the side to move
+        h = self.real_hash if real else self.fake_hash
+        return h ^ SIDE_TO_MOVE_KEY if self.current_color == Color.WHITE else h
+
+    def canonicalKey(self):
+        # Key of the fake board and the side to move that is the same for all eight symmetric
+        # images of the position, and the index of a symmetry (see zobrist.symmetries) that maps
+        # this position onto the image the key stands for.
+        h = min(self.symmetric_hashes)
+        transform = self.symmetric_hashes.index(h)
+        return (h ^ SIDE_TO_MOVE_KEY if self.current_color == Color.WHITE else h), transform
+
+    def addListener(self, listener: typing.Callable[[], None]):
+        # listener is called with no arguments after every board change
+        self.listeners.append(listener)
+
+    def notifyBoardChanged(self):
+        for listener in self.listeners:
+            listener()
+
+    def play(self, x:int, y:int):
+        if self.winner:
+            raise GameAlreadyEndedError
+
+        if x < 0 or x >= self.SIZE or y < 0 or y >= self.SIZE:
+            raise IndexError
+
+        if self.real_board.get(x, y):
+            raise DuplicatePositionError
+        
+        fake_color = self.current_color
+        real_color = fake_color
+
+        if self.rng.random() < self.flip_prob:
+            real_color = otherColor(real_color)
+
+        self.setCell(x, y, real_color, fake_color)
+
+        # the moves after the pointer stay in the tree as another variation
+        code = encodeMove(x, y, real_color, fake_color, self.SIZE)
+        node = self.currentNode().child(code)
+        self.history.truncate(self.history_pointer)
+        del self.line[self.history_pointer:]
+        self.history.codes.append(code)
+        self.line.append(node)
+        self.history_pointer += 1
+
+        if self.checkForWin(x, y):
+            node.winner = self.winner
+            self.notifyBoardChanged()
+            return
+        
+        self.current_color = otherColor(self.current_color)
+        self.notifyBoardChanged()
+        
+
+    def stepBack(self):
+        # undo one move without notifying listeners
+        x,y = self.history.cell(self.history_pointer-1)
+
+        self.setCell(x, y, None, None)
+        self.current_color = otherColor(self.current_color)
+
+        self.history_pointer -= 1
+
+    def stepForward(self):
+        # redo one move without notifying listeners
+        x,y,real_color,fake_color = self.history[self.history_pointer]
+
+        self.setCell(x, y, real_color, fake_color)
+        self.current_color = otherColor(self.current_color)
+
+        self.history_pointer += 1
+
+    def prevMove(self):
+        if self.history_pointer == 0:
+            raise IndexError("history_pointer underflow")
+        
+        self.stepBack()
+        self.notifyBoardChanged()
+    
+    def nextMove(self):
+        if self.history_pointer == len(self.history):
+            raise IndexError("history_pointer overflow")
+        
+        self.stepForward()
+        self.notifyBoardChanged()
+
+    def gotoMove(self, move: int):
+        # applies the whole jump silently and notifies listeners once at the end
+        if move < 0 or move > len(self.history):
+            raise IndexError("move out of history range")
+
+        if move == self.history_pointer:
+            return
+
+        while self.history_pointer > move:
+            self.stepBack()
+        while self.history_pointer < move:
+            self.stepForward()
+
+        self.notifyBoardChanged()
+
+    def gotoVariation(self, node: Variation):
+        # Switches to the line through node, continuing after it along the variations last
+        # visited, and leaves the pointer at node. Only the moves after the common ancestor of node
+        # and the current position are undone and replayed.
+        ancestor = commonAncestor(self.currentNode(), node)
+        if ancestor is None:
+            raise ValueError("node is not in this game's variation tree")
+
+        while self.history_pointer > ancestor.depth:
+            self.stepBack()
+
+        path = node.path(ancestor)
+        for child in path:
+            typing.cast(Variation, child.parent).selected = child
+        self.history.truncate(ancestor.depth)
+        del self.line[ancestor.depth:]
+        self.line += path
+        self.line += node.continuation()
+        self.history.codes.extend(child.code for child in self.line[ancestor.depth:])
+
+        while self.history_pointer < node.depth:
+            self.stepForward()
+        self.winner = self.line[-1].winner if self.line else None
+
+        self.notifyBoardChanged()
+
+    def switchVariation(self, offset: int):
+        # moves to the offset-th next sibling of the move at the pointer, wrapping around
+        node = self.currentNode()
+        if node.parent is None:
+            return
+        siblings = node.parent.children
+        self.gotoVariation(siblings[(siblings.index(node) + offset) % len(siblings)])
+
+    def appendMove(self, move: tuple[int,int,Color,Color]):
+        # adds a move after the last one of the line without playing it, for mirrors of games
+        # played elsewhere
+        tip = self.line[-1] if self.line else self.root
+        self.history.append(move)
+        self.line.append(tip.child(self.history.codes[-1]))
+
+    def load(self, moves: typing.Iterable[tuple[int,int,Color,Color]], flip_prob: float, seed: int):
+        # replaces this game with a recorded one, leaving the pointer after the last move; the
+        # moves are checked first, so the game is left as it was if they cannot be loaded
+
+        # raises IndexError for moves off the board
+        history = MoveHistory(self.SIZE, moves)
+        board = BitBoard(self.SIZE)
+        ended = False
+        for x, y, real_color, _ in history:
+            if ended:
+                raise GameAlreadyEndedError
+            if board.get(x, y):
+                raise DuplicatePositionError
+            board.set(x, y, real_color)
+            ended = makesFive(board.masks[real_color.value], board.index(x, y), board.shifts)
+
+        while self.history_pointer > 0:
+            self.stepBack()
+
+        self.history = history
+        self.current_color = Color.BLACK
+        self.winner = None
+        self.resetTree()
+        self.flip_prob = flip_prob
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        for x, y, real_color, fake_color in self.history:
+            # the flip of every move was drawn from the RNG, so moves played after loading get
+            # the same flips as if the game had been played on
+            self.rng.random()
+            self.setCell(x, y, real_color, fake_color)
+            self.history_pointer += 1
+            if self.checkForWin(x, y):
+                self.line[self.history_pointer-1].winner = self.winner
+            else:
+                self.current_color = otherColor(self.current_color)
+
+        self.notifyBoardChanged()
+
+    LINE_DIRECTIONS = [(1,0), (0,1), (1,1), (1,-1)]
+
+    def checkForWin(self, x: int, y: int):
+        # only the lines through the stone at (x,y) can have changed
+        color = self.real_board.get(x, y)
+        if color is None:
+            return False
+
+        for dx, dy in self.LINE_DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                i, j = x+sign*dx, y+sign*dy
+                while 0 <= i < self.SIZE and 0 <= j < self.SIZE and self.real_board.get(i, j) == color:
+                    count += 1
+                    i, j = i+sign*dx, j+sign*dy
+            if count >= 5:
+                self.winner = color
+                return True
+        return False
+
+    def cellKey(self, x: int, y: int, color: None|Color):
+        return 0 if color is None else self.zobrist_keys[color.value][x*self.SIZE + y]
+
+    def setCell(self, x: int, y: int, real_color: None|Color, fake_color: None|Color):
+        self.real_hash ^= self.cellKey(x, y, self.real_board.get(x, y)) ^ self.cellKey(x, y, real_color)
+        old_fake_color = self.fake_board.get(x, y)
+        self.fake_hash ^= self.cellKey(x, y, old_fake_color) ^ self.cellKey(x, y, fake_color)
+        if old_fake_color != fake_color:
+            cell = x*self.SIZE + y
+            hashes = self.symmetric_hashes
+            for t, keys in enumerate(self.symmetric_keys):
+                if old_fake_color is not None:
+                    hashes[t] ^= keys[old_fake_color.value][cell]
+                if fake_color is not None:
+                    hashes[t] ^= keys[fake_color.value][cell]
+
+        self.real_board.set(x, y, real_color)
+        self.fake_board.set(x, y, fake_color)
+        self.threats.update(x, y)
+        self.fake_threats.update(x, y)
+
+    def checkForFourInARow(self):
+        # any four on the real board, split ones like XX_XX included
+        return self.threats.hasFour()
+
+    def getFakeHistory(self):
+        # lazily decoded (x, y, fake color) of the moves played so far
+        return self.history.fakeMoves(self.history_pointer)
+    
+    def getRealHistory(self):
+        return self.history.realMoves(self.history_pointer)
@@ -0,0 +1,119 @@
+import array
+import itertools
+import sys
+import typing
+
+from color import Color
+
+# Moves packed as the 16-bit codes of record.py: cell index (x*size+y) << 2 | real is white << 1
+# | fake is white. A move takes two bytes instead of a tuple and its four references, which is
+# what keeps large archives of games small in memory.
+
+COLORS = (Color.BLACK, Color.WHITE)
+# codes of larger boards do not fit in 16 bits and take four bytes
+MAX_PACKED_SIZE = 128
+
+def encodeMove(x: int, y: int, real_color: Color, fake_color: Color, size: int):
+    return (x*size+y) << 2 | real_color.value << 1 | fake_color.value
+
+def decodeMove(code: int, size: int) -> tuple[int,int,Color,Color]:
+    x, y = divmod(code >> 2, size)
+    return x, y, COLORS[code >> 1 & 1], COLORS[code & 1]
+
+class MoveHistory:
+    # A sequence of (x, y, real color, fake color) moves backed by an array of codes. Moves are
+    # decoded one at a time when indexed or iterated, so reading a history builds no list, and
+    # codes is the array itself for consumers that work on codes or bytes.
+
+    __slots__ = ("size", "codes")
+
+    def __init__(self, size: int, moves: typing.Iterable[tuple[int,int,Color,Color]] = ()):
+        self.size = size
+        if isinstance(moves, MoveHistory) and moves.size == size:
+            self.codes = array.array(moves.codes.typecode, moves.codes)
+            self.checkBounds()
+            return
+        self.codes = array.array("H" if size <= MAX_PACKED_SIZE else "I")
+        for x, y, real_color, fake_color in moves:
+            # a code cannot hold a cell off the board
+            if x < 0 or x >= size or y < 0 or y >= size:
+                raise IndexError("move off the board")
+            self.codes.append(encodeMove(x, y, real_color, fake_color, size))
+
+    @classmethod
+    def fromCodes(cls, size: int, codes: typing.Iterable[int]):
+        history = cls(size)
+        history.codes.extend(codes)
+        return history
+
+    @classmethod
+    def fromBytes(cls, data: bytes, size: int):
+        # data holds little-endian 16-bit codes, as in record files
+        history = cls(size)
+        history.codes.frombytes(data)
+        if sys.byteorder == "big":
+            history.codes.byteswap()
+        history.checkBounds()
+        return history
+
+    def checkBounds(self):
+        # codes that did not come from moves on this board, e.g. read from a corrupt file, can
+        # hold cells past its last one
+        if self.codes and max(self.codes) >> 2 >= self.size*self.size:
+            raise IndexError("move off the board")
+
+    def toBytes(self):
+        codes = self.codes
+        if sys.byteorder == "big":
+            codes = array.array(codes.typecode, codes)
+            codes.byteswap()
+        return codes.tobytes()
+
+    def copy(self):
+        return MoveHistory.fromCodes(self.size, self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index: int|slice) -> typing.Any:
+        # a move, or a MoveHistory of a slice of the moves
+        if isinstance(index, slice):
+            return MoveHistory.fromCodes(self.size, self.codes[index])
+        return decodeMove(self.codes[index], self.size)
+
+    def __iter__(self):
+        size = self.size
+        for code in self.codes:
+            yield decodeMove(code, size)
+
+    def __eq__(self, other: object):
+        if isinstance(other, MoveHistory):
+            return self.size == other.size and self.codes == other.codes
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"MoveHistory({self.size}, {list(self)!r})"
+
+    def cell(self, index: int):
+        return divmod(self.codes[index] >> 2, self.size)
+
+    def append(self, move: tuple[int,int,Color,Color]):
+        self.codes.append(encodeMove(*move, self.size))
+
+    def truncate(self, length: int):
+        del self.codes[length:]
+
+    def fakeMoves(self, stop: None|int = None) -> typing.Iterator[tuple[int,int,Color]]:
+        # (x, y, fake color) of the moves before stop, decoded lazily
+        size = self.size
+        for code in itertools.islice(self.codes, stop):
+            x, y = divmod(code >> 2, size)
+            yield x, y, COLORS[code & 1]
+
+    def realMoves(self, stop: None|int = None) -> typing.Iterator[tuple[int,int,Color]]:
+        size = self.size
+        for code in itertools.islice(self.codes, stop):
+            x, y = divmod(code >> 2, size)
+            yield x, y, COLORS[code >> 1 & 1]
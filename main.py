@@ -1,4 +1,9 @@
 import sys
+import time
+# taken before the heavy imports below, for --startup-profile
+IMPORT_STARTED = time.perf_counter()
+import os
+import argparse
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtWidgets import(
     QGraphicsLineItem, QGraphicsRectItem, QGraphicsScene, QGraphicsView, QGraphicsEllipseItem, QDialog,
@@ -6,239 +11,477 @@ from PyQt5.QtWidgets import(
 )
 from PyQt5.QtCore import QRectF, QRect, pyqtSignal, QObject, Qt
 from PyQt5.QtGui import QColor, QPen, QBrush
-from enum import Enum
 import typing
-import random
+import functools
+import threading
 
 from MainWindow import Ui_MainWindow
 from Dialog import Ui_Dialog
-
-class Color(Enum):
-    BLACK = 0
-    WHITE = 1
-
-def otherColor(color: Color):
-    if color == Color.BLACK:
-        return Color.WHITE
-    else:
-        return Color.BLACK
-
-class DuplicatePositionError(Exception): pass
-class GameAlreadyEndedError(Exception): pass
-
-def drawPiece(x: float, y:float, size:float, color: Color):
-    circle = QGraphicsEllipseItem(x,y,size,size)
+from engine import Color, otherColor, DuplicatePositionError, GameAlreadyEndedError, Game
+from threats import ThreatIndex
+from variations import Variation
+from history import MoveHistory
+import record
+from worker import EngineWorker
+import analysis
+import profiling
+import woodgrain
+import protocol
+
+@functools.lru_cache(maxsize=None)
+def pieceStyle(color: Color, size: float):
+    # Pen and brush shared by every stone of this color and size. The gradient is in item
+    # coordinates and the brush is resolution independent, so zooming or a DPI change does not
+    # invalidate it; clearPieceStyles() is there for when the look itself changes.
+    gradient = QtGui.QRadialGradient(QtCore.QPointF(0,0), size)
     if color == Color.BLACK:
-        circle.setPen(QPen(QtGui.QColor(0,0,0,0), 0))
-        gradient = QtGui.QRadialGradient(QtCore.QPointF(x,y), size)
+        pen = QPen(QtGui.QColor(0,0,0,0), 0)
         gradient.setColorAt(0, QColor(150, 150, 150))
         gradient.setColorAt(1, QColor(0, 0, 0))
-        circle.setBrush(QBrush(gradient))
     else:
-        circle.setPen(QPen(QtGui.QColor(150,150,150,0), 0))
-        gradient = QtGui.QRadialGradient(QtCore.QPointF(x,y), size)
+        pen = QPen(QtGui.QColor(150,150,150,0), 0)
         gradient.setColorAt(0, QColor(255, 255, 255))
         gradient.setColorAt(1, QColor(175, 175, 175))
-        circle.setBrush(QBrush(gradient))
-    
+    return pen, QBrush(gradient)
+
+def clearPieceStyles():
+    pieceStyle.cache_clear()
+
+def drawPiece(x: float, y:float, size:float, color: Color):
+    circle = QGraphicsEllipseItem(0,0,size,size)
+    circle.setPos(x,y)
+    stylePiece(circle, color)
     return circle
 
-class GameManager(QObject):
-    SIZE = 15
+def stylePiece(circle: QGraphicsEllipseItem, color: Color):
+    pen, brush = pieceStyle(color, circle.rect().width())
+    circle.setPen(pen)
+    circle.setBrush(brush)
 
+class GameManager(QObject):
+    # Qt adapter around the headless engine.Game, turning its change notifications into signals.
+    # Changes are batched: whatever happens to the engine during one event-loop iteration is
+    # delivered as a single board_update_signal carrying the dirty flags below, followed by the
+    # per-aspect signals whose value changed. Only engine_changed_signal fires synchronously, for
+    # cheap listeners that must react before anything else runs.
+
+    PIECES_DIRTY = 1
+    TURN_DIRTY = 2
+    BOUNDS_DIRTY = 4
+    WARNING_DIRTY = 8
+
+    engine_changed_signal = pyqtSignal()
+    board_update_signal = pyqtSignal(int)
     board_changed_signal = pyqtSignal()
     pointer_is_first_move_signal = pyqtSignal(bool)
     pointer_is_last_move_signal = pyqtSignal(bool)
     four_in_a_row_signal = pyqtSignal(bool)
 
-    def __init__(self):
+    def __init__(self, size: int = Game.SIZE):
         super().__init__()
 
-        self.history: list[tuple[int,int,Color,Color]] = []
-        self.history_pointer = 0
-        self.current_color = Color.BLACK
-        self.real_board: list[list[None|Color]] = [[None]*self.SIZE for _ in range(self.SIZE)]
-        self.fake_board: list[list[None|Color]] = [[None]*self.SIZE for _ in range(self.SIZE)]
-        self.winner: None|Color = None
-        self.flip_prob = 0.1
-        self.emitBoardChangedSignals()
-    
-    def pointerAtWin(self):
-        return self.winner is not None and self.history_pointer == len(self.history)
+        self.engine = Game(size=size)
+        self.engine.addListener(self.markDirty)
+        self.SIZE = self.engine.SIZE
 
-    def emitBoardChangedSignals(self):
-        self.board_changed_signal.emit()
-        self.pointer_is_first_move_signal.emit(self.history_pointer == 0)
-        self.pointer_is_last_move_signal.emit(self.history_pointer == len(self.history))
-        self.four_in_a_row_signal.emit(not self.pointerAtWin() and self.checkForFourInARow())
+        self.flush_timer = QtCore.QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(0)
+        self.flush_timer.timeout.connect(self.emitBoardChangedSignals)
+        # what was last delivered for each aspect; None means not delivered yet
+        self.delivered: dict[int, object] = {}
 
-    def play(self, x:int, y:int):
-        if self.winner:
-            raise GameAlreadyEndedError
+        if profiling.enabled():
+            countSignals(self)
 
-        if x < 0 or x >= self.SIZE or y < 0 or y >= self.SIZE:
-            raise IndexError
+    @property
+    def history(self):
+        return self.engine.history
 
-        if self.real_board[x][y]:
-            raise DuplicatePositionError
-        
-        fake_color = self.current_color
-        real_color = fake_color
+    @property
+    def line(self):
+        return self.engine.line
+
+    @property
+    def history_pointer(self):
+        return self.engine.history_pointer
+
+    @property
+    def current_color(self):
+        return self.engine.current_color
 
-        if random.random() < self.flip_prob:
-            real_color = otherColor(real_color)
+    @property
+    def winner(self):
+        return self.engine.winner
 
-        self.real_board[x][y] = real_color
-        self.fake_board[x][y] = fake_color
+    @property
+    def flip_prob(self):
+        return self.engine.flip_prob
 
-        self.history = self.history[:self.history_pointer]
-        self.history.append( (x, y, real_color, fake_color) )
-        self.history_pointer += 1
+    @flip_prob.setter
+    def flip_prob(self, value: float):
+        self.engine.flip_prob = value
 
-        if self.checkForWin(real_color):
-            self.emitBoardChangedSignals()
+    def pointerAtWin(self):
+        return self.engine.pointerAtWin()
+
+    def markDirty(self):
+        self.engine_changed_signal.emit()
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def emitBoardChangedSignals(self):
+        # compares each aspect with what listeners last saw and delivers one consolidated update
+        self.flush_timer.stop()
+        engine = self.engine
+        state = {
+            self.PIECES_DIRTY: (engine.history_pointer, len(engine.history), engine.real_hash, engine.fake_hash),
+            self.TURN_DIRTY: (engine.current_color, engine.winner, engine.pointerAtWin()),
+            self.BOUNDS_DIRTY: (engine.history_pointer == 0, engine.history_pointer == len(engine.history), len(engine.history)),
+            self.WARNING_DIRTY: not engine.pointerAtWin() and self.fourInARow(),
+        }
+        flags = 0
+        for flag, value in state.items():
+            if self.delivered.get(flag) != value:
+                flags |= flag
+        self.delivered = state
+        if not flags:
             return
-        
-        self.current_color = otherColor(self.current_color)
-        self.emitBoardChangedSignals()
-        
 
-    def prevMove(self):
-        if self.history_pointer == 0:
-            raise IndexError("history_pointer underflow")
-        
-        x,y,_,_ = self.history[self.history_pointer-1]
+        self.board_update_signal.emit(flags)
+        self.board_changed_signal.emit()
+        if flags & self.BOUNDS_DIRTY:
+            self.pointer_is_first_move_signal.emit(state[self.BOUNDS_DIRTY][0])
+            self.pointer_is_last_move_signal.emit(state[self.BOUNDS_DIRTY][1])
+        if flags & self.WARNING_DIRTY:
+            self.four_in_a_row_signal.emit(state[self.WARNING_DIRTY])
 
-        self.real_board[x][y] = None
-        self.fake_board[x][y] = None
-        self.current_color = otherColor(self.current_color)
+    def fourInARow(self):
+        return self.engine.checkForFourInARow()
 
-        self.history_pointer -= 1
-        self.emitBoardChangedSignals()
-    
-    def nextMove(self):
-        if self.history_pointer == len(self.history):
-            raise IndexError("history_pointer overflow")
-        
-        x,y,real_color,fake_color = self.history[self.history_pointer]
+    def play(self, x:int, y:int):
+        self.engine.play(x, y)
 
-        self.real_board[x][y] = real_color
-        self.fake_board[x][y] = fake_color
-        self.current_color = otherColor(self.current_color)
+    def prevMove(self):
+        self.engine.prevMove()
 
-        self.history_pointer += 1
-        self.emitBoardChangedSignals()
+    def nextMove(self):
+        self.engine.nextMove()
 
     def gotoMove(self, move: int):
-        while self.history_pointer > move:
-            self.prevMove()
-        while self.history_pointer < move:
-            self.nextMove()
-
-    def checkForWin(self, color: Color):
-        # check for win as the gomoku rule
-        for i in range(self.SIZE):
-            for j in range(self.SIZE):
-                if self.real_board[i][j] == color:
-                    # check horizontal
-                    if j < self.SIZE - 4:
-                        if self.real_board[i][j+1] == color and self.real_board[i][j+2] == color and self.real_board[i][j+3] == color and self.real_board[i][j+4] == color:
-                            self.winner = color
-                            return True
-                    # check vertical
-                    if i < self.SIZE - 4:
-                        if self.real_board[i+1][j] == color and self.real_board[i+2][j] == color and self.real_board[i+3][j] == color and self.real_board[i+4][j] == color:
-                            self.winner = color
-                            return True
-                    # check diagonal
-                    if i < self.SIZE - 4 and j < self.SIZE - 4:
-                        if self.real_board[i+1][j+1] == color and self.real_board[i+2][j+2] == color and self.real_board[i+3][j+3] == color and self.real_board[i+4][j+4] == color:
-                            self.winner = color
-                            return True
-                    # check anti-diagonal
-                    if i > 3 and j < self.SIZE - 4:
-                        if self.real_board[i-1][j+1] == color and self.real_board[i-2][j+2] == color and self.real_board[i-3][j+3] == color and self.real_board[i-4][j+4] == color:
-                            self.winner = color
-                            return True
-        return False
-    
-    def checkForFourInARow(self):
-        for i in range(self.SIZE):
-            for j in range(self.SIZE):
-                if self.real_board[i][j] is not None:
-                    color = self.real_board[i][j]
-                    directions = [(1,0), (0,1), (-1,0), (0,-1), (1,1), (-1,1), (1,-1), (-1,-1)]
-                    for dx, dy in directions:
-                        if i+4*dx >= 0 and j+4*dy >= 0 and i+4*dx < self.SIZE and j+4*dy < self.SIZE and self.real_board[i+dx][j+dy] == color and self.real_board[i+2*dx][j+2*dy] == color and self.real_board[i+3*dx][j+3*dy] == color and self.real_board[i+4*dx][j+4*dy] == None:
-                            return True
-        return False
+        self.engine.gotoMove(move)
+
+    def switchVariation(self, offset: int):
+        self.engine.switchVariation(offset)
+
+    def load(self, moves: list[tuple[int,int,Color,Color]], flip_prob: float, seed: int):
+        self.engine.load(moves, flip_prob, seed)
 
     def getFakeHistory(self):
-        return [(x,y,col) for x,y,_,col in self.history[:self.history_pointer]]
-    
+        return self.engine.getFakeHistory()
+
     def getRealHistory(self):
-        return [(x,y,col) for x,y,col,_ in self.history[:self.history_pointer]]
+        return self.engine.getRealHistory()
+
+class RemoteGameManager(GameManager):
+    # Thin client for a game hosted by server.py. The server owns the game and tosses the flip
+    # coin; self.engine only mirrors what this client has been told, i.e. the fake colors while
+    # the game runs and the real ones once it has ended. Browsing the history stays local, and
+    # play() sends the move to the server, whose answer updates the mirror like any other move.
+
+    joined_signal = pyqtSignal(int, int)  # game id, seat
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, host: str, port: int, size: int = Game.SIZE):
+        super().__init__(size)
+        from PyQt5 import QtNetwork
+
+        self.game_id: None|int = None
+        self.seat = protocol.SPECTATOR
+        # whether the real board had a four after each move, as told by the server
+        self.fours: list[bool] = []
+        self.revealed = False
+        self.frames = protocol.FrameReader()
+        self.socket = QtNetwork.QTcpSocket(self)
+        self.socket.readyRead.connect(self.onReadyRead)
+        self.socket.errorOccurred.connect(lambda _: self.error_signal.emit(self.socket.errorString()))
+        # writes made before the connection is up are buffered by the socket
+        self.socket.connectToHost(host, port)
+
+    def send(self, kind: int, payload: bytes = b""):
+        self.socket.write(protocol.frame(kind, payload))
+
+    def create(self):
+        self.send(protocol.CREATE, protocol.CREATE_PAYLOAD.pack(self.SIZE, protocol.flipToWire(self.flip_prob)))
+
+    def join(self, game_id: int, seat: int):
+        self.send(protocol.JOIN, protocol.JOIN_PAYLOAD.pack(game_id, seat))
+
+    def resign(self):
+        self.send(protocol.RESIGN)
+
+    def play(self, x:int, y:int):
+        engine = self.engine
+        if engine.winner:
+            raise GameAlreadyEndedError
+        if len(engine.history) % 2 != self.seat:
+            return
+        # moves always go after the last one, so leave any browsing first
+        engine.gotoMove(len(engine.history))
+        if engine.fake_board.get(x, y):
+            raise DuplicatePositionError
+        self.send(protocol.MOVE, protocol.MOVE_PAYLOAD.pack(protocol.liveCode(x, y, Color.BLACK, False, self.SIZE)))
+
+    def fourInARow(self):
+        # until the game is over the mirror's real board is only the fake one
+        if self.revealed:
+            return super().fourInARow()
+        pointer = self.engine.history_pointer
+        return pointer > 0 and self.fours[pointer-1]
+
+    def onReadyRead(self):
+        for kind, payload in self.frames.feed(bytes(self.socket.readAll())):
+            self.handleFrame(kind, payload)
+
+    def handleFrame(self, kind: int, payload: bytes):
+        if kind == protocol.JOINED:
+            game_id, seat, size, flip = protocol.JOINED_PAYLOAD.unpack(payload)
+            if size != self.SIZE:
+                self.engine = Game(size=size)
+                self.engine.addListener(self.markDirty)
+                self.SIZE = size
+            self.engine.flip_prob = protocol.flipFromWire(flip)
+            self.game_id, self.seat = game_id, seat
+            self.joined_signal.emit(game_id, seat)
+        elif kind == protocol.STATE:
+            moves = protocol.decodeLiveCodes(payload[protocol.STATE_PAYLOAD.size:], self.SIZE)
+            self.fours = [four for _, _, _, four in moves]
+            self.revealed = False
+            self.replaceMoves(MoveHistory(self.SIZE, ((x, y, fake, fake) for x, y, fake, _ in moves)), None)
+        elif kind == protocol.ENDED:
+            (winner,) = protocol.ENDED_PAYLOAD.unpack_from(payload)
+            self.revealed = True
+            self.replaceMoves(record.decodeMoves(payload[protocol.ENDED_PAYLOAD.size:], self.SIZE), protocol.WINNERS[winner])
+        elif kind == protocol.MOVED:
+            (code,) = protocol.MOVE_PAYLOAD.unpack(payload)
+            x, y, fake, four = protocol.decodeLiveCode(code, self.SIZE)
+            engine = self.engine
+            following = engine.history_pointer == len(engine.history)
+            engine.appendMove((x, y, fake, fake))
+            self.fours.append(four)
+            if following:
+                engine.stepForward()
+            engine.notifyBoardChanged()
+        elif kind == protocol.ERROR:
+            self.error_signal.emit(payload.decode(errors="replace"))
+
+    def replaceMoves(self, moves: MoveHistory, winner: None|Color):
+        # applied silently and announced once, leaving the pointer after the last move
+        engine = self.engine
+        while engine.history_pointer > 0:
+            engine.stepBack()
+        engine.history = moves
+        while engine.history_pointer < len(moves):
+            engine.stepForward()
+        engine.winner = winner
+        engine.current_color = winner if winner is not None else Color(len(moves) % 2)
+        engine.resetTree()
+        engine.notifyBoardChanged()
+
+def starPoints(size: int):
+    # the usual five points up to 18 lines; larger boards get a lattice about six lines apart
+    if size < 7:
+        return []
+    edge = 3 if size >= 13 else 2
+    if size < 19:
+        points = [(x,y) for x in (edge, size-1-edge) for y in (edge, size-1-edge)]
+        if size % 2:
+            points.append((size//2, size//2))
+        return points
+    gaps = max(2, round((size-1-2*edge) / 6))
+    lines = [edge + round(i*(size-1-2*edge)/gaps) for i in range(gaps+1)]
+    return [(x,y) for x in lines for y in lines]
 
 class BoardManager(QObject):
 
     game_ended_signal = pyqtSignal(Color)
+    # the size and array of a wood texture, delivered from the thread that loads or generates it
+    texture_ready_signal = pyqtSignal(int, object)
 
-    BOARDSIZE = 15
     LEN = 30
+    # large boards are not shrunk below this many pixels per cell; the view scrolls instead
+    MIN_CELL_PIXELS = 20
 
     def __init__(self, view: QGraphicsView):
         super().__init__()
 
         self.view = view
         self.scene = QGraphicsScene(self.view)
+        # the index lets painting skip every stone outside the visible part of a large board
+        self.scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.BspTreeIndex)
         self.view.setScene(self.scene)
 
-        self.scene.setSceneRect(0, 0, self.BOARDSIZE*(self.LEN+1), self.BOARDSIZE*(self.LEN+1))
-        self.drawBoardLines()
+        self.size = 0
+        self.grid_item: None|QtWidgets.QGraphicsPathItem = None
+
+        # one item per displayed stone, in move order: (x, y, shown color, item, variation node)
+        self.piece_cache: list[tuple[int,int,Color,QGraphicsEllipseItem,Variation]] = []
+        self.shown_real = False
 
-        self.piece_items = QGraphicsItemGroup()
-        self.scene.addItem(self.piece_items)
+        rad = self.LEN/10
+        self.last_move_marker = QtWidgets.QGraphicsRectItem(self.LEN/2-rad, self.LEN/2-rad, rad*2, rad*2)
+        self.last_move_marker.setZValue(1)
+        self.last_move_marker.hide()
+        self.scene.addItem(self.last_move_marker)
 
         self.game = GameManager()
-        self.game.board_changed_signal.connect(self.refresh_piece_items)
         self.activated = False
 
         self.showing_real = False
 
+        # seconds the computer opponent may think per move, or None when nobody plays against it
+        self.computer_time_budget: None|float = None
+        self.computer_color = Color.WHITE
+
+        self.hint_marker = QGraphicsEllipseItem(2, 2, self.LEN-4, self.LEN-4)
+        self.hint_marker.setPen(QPen(QColor(0,160,0), 3))
+        self.hint_marker.setZValue(2)
+        self.hint_marker.hide()
+        self.scene.addItem(self.hint_marker)
+
+        self.worker = EngineWorker()
+        self.worker.result_ready.connect(self.onWorkerResult)
+        # opening book (see book.py) the computer and hints answer from while it knows the position
+        self.book_path: None|str = None
+
         self.view.mousePressEvent = self.chess_board_mousePress
 
+        # the fit-to-view scale only depends on the view size, so it is recomputed on resize
+        # rather than on every paint
+        self.fitted_size = QtCore.QSize()
+        self.scale_ratio = 1.0
+
+        # A wood texture at least as large as the view in physical pixels is scaled to cover it
+        # and rendered into its background cache. It is loaded or generated on a background
+        # thread when the view is fitted and outgrows the texture it has; until the first one
+        # arrives the flat stylesheet color shows.
+        self.view.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground)
+        self.background_pixmap: None|QtGui.QPixmap = None
+        self.background_size = 0
+        self.requested_texture_size = 0
+        self.texture_ready_signal.connect(self.onTextureReady)
+        self.view.installEventFilter(self)
+
         self.clear()
 
-    def clear(self):
-        self.scene.removeItem(self.piece_items)
-        self.game = GameManager()
-        self.game.board_changed_signal.connect(self.refresh_piece_items)
-        self.piece_items = QGraphicsItemGroup()
-        self.scene.addItem(self.piece_items)
+    def clear(self, size: int = Game.SIZE, game: None|GameManager = None):
+        # game replaces the fresh local GameManager, e.g. with a RemoteGameManager
+        for _,_,_,item,_ in self.piece_cache:
+            self.scene.removeItem(item)
+        self.piece_cache = []
+        self.last_move_marker.hide()
+        self.hint_marker.hide()
+        self.worker.cancel()
+        self.game = game if game is not None else GameManager(size)
+        if self.game.SIZE != self.size:
+            self.setBoardSize(self.game.SIZE)
+        self.game.board_update_signal.connect(self.onBoardUpdate)
+        # anything the worker is computing is about the old position now
+        self.game.engine_changed_signal.connect(self.worker.cancel)
+        self.game.engine_changed_signal.connect(self.hint_marker.hide)
         self.showing_real = False
+        self.shown_real = False
+        self.computer_time_budget = None
+
+    def setBoardSize(self, size: int):
+        self.size = size
+        self.scene.setSceneRect(0, 0, size*(self.LEN+1), size*(self.LEN+1))
+        self.drawBoardLines()
+        # refit on the next check even if the view size did not change
+        self.fitted_size = QtCore.QSize()
+        self.fitToView()
 
     def drawBoardLines(self):
-        for i in range(self.BOARDSIZE):
-            line1 = QtWidgets.QGraphicsLineItem(self.LEN/2, self.LEN/2+i*self.LEN, self.LEN/2+(self.BOARDSIZE-1)*self.LEN, self.LEN/2+i*self.LEN)
-            pen1 = QtGui.QPen(QtGui.QColor(0,0,0), 1)
-            pen1.setCosmetic(True)
-            line1.setPen(pen1)
-            line2 = QtWidgets.QGraphicsLineItem(self.LEN/2+i*self.LEN, self.LEN/2, self.LEN/2+i*self.LEN, self.LEN/2+(self.BOARDSIZE-1)*self.LEN)
-            pen2 = QtGui.QPen(QtGui.QColor(0,0,0), 1)
-            pen2.setCosmetic(True)
-            line2.setPen(pen2)
-            self.scene.addItem(line1)
-            self.scene.addItem(line2)
-        
+        # the grid and star points are a single path item cached as a pixmap, so a board of any
+        # size costs one item and, until the zoom changes, one blit per paint
+        if self.grid_item is not None:
+            self.scene.removeItem(self.grid_item)
+
+        path = QtGui.QPainterPath()
+        start, end = self.LEN/2, self.LEN/2+(self.size-1)*self.LEN
+        for i in range(self.size):
+            path.moveTo(start, self.LEN/2+i*self.LEN)
+            path.lineTo(end, self.LEN/2+i*self.LEN)
+            path.moveTo(self.LEN/2+i*self.LEN, start)
+            path.lineTo(self.LEN/2+i*self.LEN, end)
+
         dot_radius = self.LEN/3
+        for x,y in starPoints(self.size):
+            path.addEllipse(self.LEN/2-dot_radius/2+x*self.LEN, self.LEN/2-dot_radius/2+y*self.LEN, dot_radius, dot_radius)
 
-        for x,y in [(7,7),(3,3),(11,11),(3,11),(11,3)]:
-            dot0 = QGraphicsEllipseItem(self.LEN/2-dot_radius/2+x*self.LEN, self.LEN/2-dot_radius/2+y*self.LEN, dot_radius, dot_radius)
-            dot0.setPen(QtGui.QPen(QtGui.QColor(0,0,0), 1))
-            dot0.setBrush(QtGui.QBrush(QtGui.QColor(0,0,0)))
-            self.scene.addItem(dot0)
+        pen = QtGui.QPen(QtGui.QColor(0,0,0), 1)
+        pen.setCosmetic(True)
+        self.grid_item = self.scene.addPath(path, pen, QtGui.QBrush(QtGui.QColor(0,0,0)))
+        self.grid_item.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
+    def eventFilter(self, obj: QObject, event: QtCore.QEvent):
+        if obj is self.view and event.type() in (QtCore.QEvent.Type.Resize, QtCore.QEvent.Type.Show):
+            self.fitToView()
+        return False
+
+    def fitToView(self):
+        view_size = self.view.size()
+        if view_size == self.fitted_size:
+            return
+        self.fitted_size = view_size
 
+        scene_rect = self.scene.sceneRect()
+        ratio = min( view_size.width() / scene_rect.width(), view_size.height() / scene_rect.height() ) * 0.8
+        ratio = max(ratio, self.MIN_CELL_PIXELS / self.LEN)
 
+        self.view.resetTransform()
+        self.view.scale(ratio, ratio)
+        self.scale_ratio = ratio
+        self.updateBackground()
+
+    def requestTexture(self, size: int):
+        if self.requested_texture_size >= size:
+            return
+        self.requested_texture_size = size
+        threading.Thread(target=lambda: self.texture_ready_signal.emit(size, woodgrain.texture(size)),
+                         name="woodgrain", daemon=True).start()
+
+    def onTextureReady(self, size: int, image: typing.Any):
+        if size == self.requested_texture_size:
+            self.requested_texture_size = 0
+        # a smaller texture may arrive after a larger one that was requested later
+        if image is None or size <= self.background_size:
+            return
+        self.background_pixmap = QtGui.QPixmap.fromImage(
+            QtGui.QImage(image.data, size, size, 3*size, QtGui.QImage.Format.Format_RGB888))
+        self.background_size = size
+        self.updateBackground()
+
+    def updateBackground(self):
+        # the view rather than its viewport, which is only resized after the view's resize event
+        view_size = self.view.size()
+        dpr = self.view.devicePixelRatioF()
+        pixels = max(view_size.width(), view_size.height()) * dpr
+        # a larger view gets a larger texture; a smaller one keeps scaling the one it has down
+        size = woodgrain.textureSize(pixels)
+        if size > self.background_size:
+            self.requestTexture(size)
+        if self.background_pixmap is None:
+            return
+        # the texture covers the view from its top left corner
+        texel = pixels / self.background_size
+        brush = QBrush(self.background_pixmap)
+        origin = self.view.mapToScene(0, 0)
+        transform = QtGui.QTransform()
+        transform.translate(origin.x(), origin.y())
+        transform.scale(texel/(self.scale_ratio*dpr), texel/(self.scale_ratio*dpr))
+        brush.setTransform(transform)
+        self.scene.setBackgroundBrush(brush)
 
     def activate(self):
         self.activated = True
@@ -252,54 +495,109 @@ class BoardManager(QObject):
         y = round(spos.y() / self.LEN-0.5)
         return x, y
 
-    def createPieceItem(self, x:int, y:int, color: Color, last_move: bool = False):
-        circle = drawPiece(x*self.LEN+1, y*self.LEN+1, self.LEN-2, color)
+    def createPieceItem(self, x:int, y:int, color: Color):
+        return drawPiece(x*self.LEN+1, y*self.LEN+1, self.LEN-2, color)
 
-        piece = QGraphicsItemGroup()
-        piece.addToGroup(circle)
+    def moveLastMoveMarker(self, x:int, y:int, color: Color):
+        dot_color = QColor(255,255,255) if color == Color.BLACK else QColor(0,0,255)
+        self.last_move_marker.setPen(QPen(dot_color, 1))
+        self.last_move_marker.setBrush(QBrush(dot_color))
+        self.last_move_marker.setPos(x*self.LEN, y*self.LEN)
+        self.last_move_marker.show()
 
-        if last_move:
-            rad = self.LEN/10
-            dot = QtWidgets.QGraphicsRectItem(x*self.LEN+self.LEN/2-rad, y*self.LEN+self.LEN/2-rad, rad*2, rad*2)
-            dot_color = QColor(255,255,255) if color == Color.BLACK else QColor(0,0,255)
-            dot.setPen(QPen(dot_color, 1))
-            dot.setBrush(QBrush(dot_color))
-            piece.addToGroup(dot)
-        
-        return typing.cast(QGraphicsItem, piece)
+    def onBoardUpdate(self, flags: int):
+        if flags & GameManager.PIECES_DIRTY:
+            self.refresh_piece_items()
+        if flags & GameManager.TURN_DIRTY and self.activated and self.game.winner:
+            # the game ended other than through playMove, e.g. in a remote game
+            self.disactivate()
+            self.game_ended_signal.emit(self.game.winner)
 
     def refresh_piece_items(self):
-        self.scene.removeItem(self.piece_items)
-        self.piece_items = QGraphicsItemGroup()
-
-        history = self.game.getRealHistory() if self.showing_real else self.game.getFakeHistory()
-
-        if len(history) != 0:
-            for x,y,color in history[:-1]:
-                self.piece_items.addToGroup(self.createPieceItem(x,y,color))
-            
-            x,y,color = history[-1]
-            self.piece_items.addToGroup(self.createPieceItem(x,y,color,last_move=True))
-
-        self.scene.addItem(self.piece_items)
+        # Only touches the stones that differ from what is on screen: stones past the history
+        # pointer or from another variation are removed, new ones are added, and toggling the
+        # real view recolors the cells where the real and fake colors disagree. A cached stone
+        # whose variation node is on the current line has its whole prefix there as well.
+        history = self.game.history
+        line = self.game.line
+        pointer = self.game.history_pointer
+        color_index = 2 if self.showing_real else 3
+
+        cache = self.piece_cache
+        while len(cache) > pointer or (cache and cache[-1][4] is not line[len(cache)-1]):
+            _,_,_,item,_ = cache.pop()
+            self.scene.removeItem(item)
+
+        if self.shown_real != self.showing_real:
+            for i, (x,y,shown,item,node) in enumerate(cache):
+                color = history[i][color_index]
+                if color != shown:
+                    stylePiece(item, color)
+                    cache[i] = (x,y,color,item,node)
+            self.shown_real = self.showing_real
+
+        for i in range(len(cache), pointer):
+            move = history[i]
+            x,y,color = move[0], move[1], move[color_index]
+            item = self.createPieceItem(x,y,color)
+            self.scene.addItem(item)
+            cache.append((x,y,color,item,line[i]))
+
+        if cache:
+            x,y,color,_,_ = cache[-1]
+            self.moveLastMoveMarker(x,y,color)
+        else:
+            self.last_move_marker.hide()
 
     def chess_board_mousePress(self, event: QtGui.QMouseEvent):
         if not self.activated:
             return
 
         x,y = self.getCoords(event.pos())
-        if x < 0 or x >= self.BOARDSIZE or y < 0 or y >= self.BOARDSIZE:
+        if x < 0 or x >= self.size or y < 0 or y >= self.size:
+            return
+
+        if self.isComputerTurn():
+            # e.g. after undoing the computer's move: let it move again instead of playing for it
+            QtCore.QTimer.singleShot(0, self.playComputerMove)
             return
 
         try:
-            self.game.play(x,y)
+            self.playMove(x,y)
+        except DuplicatePositionError:
+            return
 
-            if self.game.winner:
-                self.disactivate()
-                self.game_ended_signal.emit(self.game.winner)
+        if self.isComputerTurn():
+            # return to the event loop first so the player's stone is drawn before the search
+            QtCore.QTimer.singleShot(0, self.playComputerMove)
 
-        except DuplicatePositionError:
-            pass
+    def playMove(self, x:int, y:int):
+        self.game.play(x,y)
+
+        if self.game.winner:
+            self.disactivate()
+            self.game_ended_signal.emit(self.game.winner)
+
+    def isComputerTurn(self):
+        return self.activated and self.computer_time_budget is not None and self.game.current_color == self.computer_color
+
+    def playComputerMove(self):
+        if not self.isComputerTurn():
+            return
+        self.worker.request("computer_move", analysis.computerMove, self.game.engine.copy(), self.computer_time_budget,
+                            self.book_path)
+
+    def requestHint(self, time_budget: float):
+        self.worker.request("hint", analysis.hint, self.game.engine.copy(), time_budget, self.book_path)
+
+    def showHint(self, x:int, y:int):
+        self.hint_marker.setPos(x*self.LEN, y*self.LEN)
+        self.hint_marker.show()
+
+    def onWorkerResult(self, kind: str, result: object):
+        if kind == "computer_move" and self.isComputerTurn():
+            x,y = typing.cast(tuple[int,int], result)
+            self.playMove(x,y)
 
 class StartDialog(QtWidgets.QDialog, Ui_Dialog):
     def __init__(self):
@@ -313,17 +611,25 @@ class StartDialog(QtWidgets.QDialog, Ui_Dialog):
         self.flip_prob_text.setText(f"Flip probability: {self.flip_prob_slider.value()}%")
     
     def getData(self):
-        return {"flip_prob_percent": self.flip_prob_slider.value()}
+        return {"flip_prob_percent": self.flip_prob_slider.value(),
+                "computer_opponent": self.computer_checkbox.isChecked(),
+                "board_size": self.board_size_spinbox.value()}
 
 class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
     TURN_CIRCLE_SIZE = 50
+    COMPUTER_TIME_BUDGET = 0.5
+    HINT_TIME_BUDGET = 1.0
+    # a 128 pixel copy of icon.png, which is 1.7 MB
+    ICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icon-128.png")
 
     def __init__(self, *args, obj=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.setupUi(self)
 
         self.board_manager = BoardManager(self.chess_board)
+        # (host, port) of a server.py to play on instead of locally
+        self.remote_address: None|tuple[str,int] = None
 
         self.resign_button.setDisabled(True)
         
@@ -359,10 +665,32 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         self.toggle_real.clicked.connect(toggleReal)
 
+        self.hint_button.clicked.connect(self.requestHint)
+        self.board_manager.worker.result_ready.connect(self.onWorkerResult)
+
+        file_menu = self.menubar.addMenu("File")
+        # recorded games are local, so they cannot be opened while playing on a server
+        self.open_record_action = file_menu.addAction("Open Record...", self.openRecord)
+        file_menu.addAction("Save Record...", self.saveRecord)
+        # lines left by undoing and playing elsewhere are kept; these switch between the
+        # alternatives to the move at the pointer
+        game_menu = self.menubar.addMenu("Game")
+        game_menu.addAction("Previous Variation", lambda: self.board_manager.game.switchVariation(-1), "Ctrl+Up")
+        game_menu.addAction("Next Variation", lambda: self.board_manager.game.switchVariation(1), "Ctrl+Down")
+
+        self.turn_scene = QGraphicsScene()
+        self.turn_circle = drawPiece(0, 0, self.TURN_CIRCLE_SIZE, Color.BLACK)
+        self.turn_circle.hide()
+        self.turn_scene.addItem(self.turn_circle)
+        self.turnView.setScene(self.turn_scene)
+
         self.four_in_a_row_text = self.four_in_a_row_warning.text()
         self.four_in_a_row_warning.setText("")
 
     
+    def loadIcon(self):
+        self.setWindowIcon(QtGui.QIcon(self.ICON_PATH))
+
     def setTurnView(self):
         if self.board_manager.game.pointerAtWin():
             background_color = QColor(255,255,0)
@@ -371,13 +699,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             background_color = QColor(100,100,100)
             color = self.board_manager.game.current_color
 
-        scene = QGraphicsScene()
-
-        circle = drawPiece(0, 0, self.TURN_CIRCLE_SIZE, color)
-        scene.setBackgroundBrush(background_color)
-        scene.addItem(circle)
-
-        self.turnView.setScene(scene)
+        stylePiece(self.turn_circle, color)
+        self.turn_circle.show()
+        self.turn_scene.setBackgroundBrush(background_color)
     
     def startGame(self):
         dialog = StartDialog()
@@ -386,7 +710,11 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         self.board_manager.activate()
         self.game_status.setText("Game ongoing...")
-        self.board_manager.clear()
+        if self.remote_address is not None:
+            self.board_manager.clear(game=RemoteGameManager(*self.remote_address, dialog.getData()["board_size"]))
+            self.game_status.setText("Connecting...")
+        else:
+            self.board_manager.clear(dialog.getData()["board_size"])
         self.resign_button.setEnabled(True)
         self.start_button.setDisabled(True)
         self.toggle_real.setText("Show Real Game")
@@ -397,6 +725,42 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         flip_prob_percent = dialog.getData()["flip_prob_percent"]
         self.board_manager.game.flip_prob = flip_prob_percent/100
 
+        if dialog.getData()["computer_opponent"] and self.remote_address is None:
+            self.board_manager.computer_time_budget = self.COMPUTER_TIME_BUDGET
+
+        self.connectGameSignals()
+        self.move_slider.setDisabled(True)
+        if isinstance(self.board_manager.game, RemoteGameManager):
+            self.board_manager.game.create()
+
+    def joinRemoteGame(self, game_id: int, seat: int):
+        assert self.remote_address is not None
+        self.board_manager.clear(game=RemoteGameManager(*self.remote_address))
+        self.connectGameSignals()
+        self.game_status.setText("Connecting...")
+        self.toggle_real.setText("Show Real Game")
+        if seat == protocol.SPECTATOR:
+            self.board_manager.disactivate()
+            self.resign_button.setDisabled(True)
+        else:
+            self.board_manager.activate()
+            self.resign_button.setEnabled(True)
+            self.start_button.setDisabled(True)
+            self.undo_button.setText("Undo")
+            self.redo_button.setText("Redo")
+        typing.cast(RemoteGameManager, self.board_manager.game).join(game_id, seat)
+
+    def onJoined(self, game_id: int, seat: int):
+        # the board size of a joined game is only known now
+        if self.board_manager.game.SIZE != self.board_manager.size:
+            self.board_manager.setBoardSize(self.board_manager.game.SIZE)
+        role = {protocol.BLACK_SEAT: "playing Black", protocol.WHITE_SEAT: "playing White"}.get(seat, "watching")
+        self.game_status.setText(f"Game {game_id}, {role}")
+
+    def onRemoteError(self, message: str):
+        self.game_status.setText(f"Server: {message}")
+
+    def connectGameSignals(self):
         self.board_manager.game.pointer_is_first_move_signal.connect(lambda Is: self.undo_button.setDisabled(Is))
         self.board_manager.game.pointer_is_last_move_signal.connect(lambda Is: self.redo_button.setDisabled(Is))
 
@@ -406,30 +770,17 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             )
         )
 
-        self.setTurnView()
-        self.board_manager.game.board_changed_signal.connect(self.setTurnView)
-        self.board_manager.game.board_changed_signal.connect(self.updateMoveSlider)
-        self.move_slider.setDisabled(True)
-
-    def paintEvent(self, event):
-        super().paintEvent(event)
-        
-        if self.board_manager.scene:
-            scene_rect = self.board_manager.scene.sceneRect()
-            view_size = self.board_manager.view.size()
-
-            ratio = min( view_size.width() / scene_rect.width(), view_size.height() / scene_rect.height() ) * 0.8
-
-            self.board_manager.view.resetTransform()
-
-
-            self.board_manager.view.scale(ratio, ratio)
-            # self.board_manager.view.scale(view_size.width() / scene_rect.width(), view_size.height() / scene_rect.height())
+        self.board_manager.game.board_update_signal.connect(self.onBoardUpdate)
+        self.board_manager.game.engine_changed_signal.connect(lambda: self.hint_label.setText(""))
+        if isinstance(self.board_manager.game, RemoteGameManager):
+            self.board_manager.game.joined_signal.connect(self.onJoined)
+            self.board_manager.game.error_signal.connect(self.onRemoteError)
+        # deliver the state of the fresh game right away
+        self.board_manager.game.emitBoardChangedSignals()
 
-        # if self.board_manager.scene:
-        #     self.board_manager.view.fitInView(self.board_manager.scene.sceneRect(), mode=Qt.AspectRatioMode.IgnoreAspectRatio)
-    
     def resignGame(self):
+        if isinstance(self.board_manager.game, RemoteGameManager):
+            self.board_manager.game.resign()
 
         self.board_manager.disactivate()
         self.resign_button.setDisabled(True)
@@ -439,6 +790,82 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.undo_button.setText("Prev")
         self.redo_button.setText("Next")
     
+    def openRecord(self):
+        if self.remote_address is not None:
+            QtWidgets.QMessageBox.information(self, "Open Record", "Records cannot be opened while connected to a server.")
+            return
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open Record", "", "RandGomoku records (*.rgr);;All files (*)")
+        if not path:
+            return
+
+        try:
+            games = list(record.readGames(path))
+        except (OSError, record.RecordFormatError) as error:
+            QtWidgets.QMessageBox.warning(self, "Open Record", str(error))
+            return
+        if not games:
+            QtWidgets.QMessageBox.warning(self, "Open Record", "The record file contains no games.")
+            return
+
+        index = 0
+        if len(games) > 1:
+            index, ok = QtWidgets.QInputDialog.getInt(self, "Open Record", f"Game number (1-{len(games)}):", 1, 1, len(games))
+            if not ok:
+                return
+            index -= 1
+        flip_prob, seed, size, moves = games[index]
+
+        # loaded before it replaces the current game, which stays as it is if the record is invalid
+        game = GameManager(size)
+        try:
+            game.load(moves, flip_prob, seed)
+        except (DuplicatePositionError, GameAlreadyEndedError, IndexError):
+            QtWidgets.QMessageBox.warning(self, "Open Record", "The recorded game is not valid.")
+            return
+        self.board_manager.clear(size, game)
+        self.connectGameSignals()
+
+        winner = self.board_manager.game.winner
+        if winner:
+            self.board_manager.disactivate()
+            self.game_status.setText(f"Recorded game.\nWinner: {'Black' if winner == Color.BLACK else 'White'}")
+            self.resign_button.setDisabled(True)
+            self.start_button.setEnabled(True)
+            self.undo_button.setText("Prev")
+            self.redo_button.setText("Next")
+        else:
+            self.board_manager.activate()
+            self.game_status.setText("Game ongoing...")
+            self.resign_button.setEnabled(True)
+            self.start_button.setDisabled(True)
+            self.undo_button.setText("Undo")
+            self.redo_button.setText("Redo")
+        self.toggle_real.setText("Show Real Game")
+
+    def saveRecord(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Record", "", "RandGomoku records (*.rgr);;All files (*)")
+        if not path:
+            return
+
+        try:
+            with record.RecordWriter(path) as writer:
+                writer.writeGame(self.board_manager.game.engine)
+        except OSError as error:
+            QtWidgets.QMessageBox.warning(self, "Save Record", str(error))
+
+    def requestHint(self):
+        if self.board_manager.game.winner and self.board_manager.game.pointerAtWin():
+            return
+        self.hint_label.setText("Thinking...")
+        self.board_manager.requestHint(self.HINT_TIME_BUDGET)
+
+    def onWorkerResult(self, kind: str, result: object):
+        if kind != "hint":
+            return
+        (x,y), win_rate = typing.cast(tuple[tuple[int,int], float], result)
+        self.board_manager.showHint(x,y)
+        self.hint_label.setText(f"Hint: {win_rate:.0%} to win")
+
     def undoMove(self):
         self.board_manager.game.prevMove()
 
@@ -448,6 +875,12 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def gotoMove(self, position: int):
         self.board_manager.game.gotoMove(position)
 
+    def onBoardUpdate(self, flags: int):
+        if flags & GameManager.TURN_DIRTY:
+            self.setTurnView()
+        if flags & (GameManager.BOUNDS_DIRTY | GameManager.PIECES_DIRTY):
+            self.updateMoveSlider()
+
     def updateMoveSlider(self):
         if len(self.board_manager.game.history) == 0:
             self.move_slider.setDisabled(True)
@@ -455,14 +888,168 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         
         self.move_slider.setEnabled(True)
         self.move_slider.setMinimum(0)
+        # the slider only reflects the game here; it must not feed back into gotoMove
+        self.move_slider.blockSignals(True)
         self.move_slider.setMaximum(len(self.board_manager.game.history))
         self.move_slider.setValue(self.board_manager.game.history_pointer)
+        self.move_slider.blockSignals(False)
         self.move_label.setText(f"Move: {self.board_manager.game.history_pointer}")
 
 
 
-app = QtWidgets.QApplication(sys.argv)
+class PaintStats(QObject):
+    # Counts paint events on a widget and reports them with the process CPU time spent, so an
+    # idle window can be checked to paint nothing and cost nothing.
+
+    def __init__(self, widget: QtWidgets.QWidget, interval_ms: int = 5000):
+        super().__init__()
+        self.frames = 0
+        self.cpu_time = time.process_time()
+        self.wall_time = time.perf_counter()
+        widget.installEventFilter(self)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.report)
+        self.timer.start(interval_ms)
+
+    def eventFilter(self, obj: QObject, event: QtCore.QEvent):
+        if event.type() == QtCore.QEvent.Type.Paint:
+            self.frames += 1
+        return False
+
+    def report(self):
+        cpu_time, wall_time = time.process_time(), time.perf_counter()
+        elapsed = wall_time - self.wall_time
+        print(f"paint stats: {self.frames} frames, {self.frames/elapsed:.1f} fps, "
+              f"cpu {100*(cpu_time-self.cpu_time)/elapsed:.1f}% over {elapsed:.1f}s", file=sys.stderr)
+        self.frames = 0
+        self.cpu_time, self.wall_time = cpu_time, wall_time
+
+class StartupProfile(QObject):
+    # Times the startup phases from the moment main.py started importing up to the first paint of
+    # the board, reports them to stderr and quits. Interpreter startup before that is not included.
+
+    def __init__(self):
+        super().__init__()
+        self.marks: list[tuple[str, float]] = [("imports", time.perf_counter())]
+
+    def mark(self, phase: str):
+        self.marks.append((phase, time.perf_counter()))
 
-window = MainWindow()
-window.show()
-app.exec()
\ No newline at end of file
+    def watch(self, widget: QtWidgets.QWidget):
+        self.widget = widget
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj: QObject, event: QtCore.QEvent):
+        if event.type() == QtCore.QEvent.Type.Paint:
+            self.widget.removeEventFilter(self)
+            # runs once the paint has finished
+            QtCore.QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self):
+        self.mark("first paint")
+        previous = IMPORT_STARTED
+        for phase, moment in self.marks:
+            print(f"startup: {phase:12} {1000*(moment-previous):8.1f} ms  (total {1000*(moment-IMPORT_STARTED):.1f} ms)",
+                  file=sys.stderr)
+            previous = moment
+        QtWidgets.QApplication.quit()
+
+def countSignals(obj: QObject):
+    # counts the emissions of every signal declared on obj's class under "Class.signal"
+    for cls in type(obj).__mro__:
+        if cls.__module__ != __name__:
+            continue
+        for name, value in vars(cls).items():
+            if isinstance(value, pyqtSignal):
+                getattr(obj, name).connect(lambda *args, key=f"{cls.__name__}.{name}": profiling.countSignal(key))
+
+def instrumentClasses():
+    # must run before the window is created so every instance picks up the wrappers; the engine
+    # worker process is not instrumented
+    for attribute in ("play", "checkForWin", "checkForFourInARow"):
+        profiling.instrument(Game, attribute)
+    profiling.instrument(ThreatIndex, "update")
+    profiling.instrument(GameManager, "emitBoardChangedSignals")
+    profiling.instrument(BoardManager, "refresh_piece_items")
+
+def instrumentWindow(window: MainWindow, interval_ms: int = 1000):
+    board_manager = window.board_manager
+    profiling.instrument(board_manager.view, "paintEvent", "BoardView.paintEvent")
+    countSignals(board_manager)
+    countSignals(board_manager.worker)
+
+    def sample():
+        profiling.gauge("board.scene_items", len(board_manager.scene.items()))
+        profiling.gauge("board.pieces", len(board_manager.piece_cache))
+        profiling.gauge("turn.scene_items", len(window.turn_scene.items()))
+
+    timer = QtCore.QTimer(window)
+    timer.timeout.connect(sample)
+    timer.start(interval_ms)
+
+def main():
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="RandGomoku")
+    parser.add_argument("--paint-stats", action="store_true",
+                        help="periodically print board frames painted and CPU usage to stderr")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                        help=f"instrument hot paths and write the stats to FILE (default stderr) at exit; "
+                             f"also enabled by {profiling.ENV_VAR}")
+    parser.add_argument("--profile-port", type=int, metavar="PORT",
+                        help="serve the profiling stats as JSON on http://127.0.0.1:PORT/ while running")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="play on a server.py server; Start creates a game there")
+    parser.add_argument("--join", type=int, metavar="GAME_ID", help="join a game on the server given by --connect")
+    parser.add_argument("--seat", choices=["black", "white", "spectator"], default="white",
+                        help="seat taken with --join")
+    parser.add_argument("--book", metavar="FILE",
+                        help="opening book built by book.py for the computer player and hints")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print the time spent in each startup phase up to the first paint, then quit")
+    args, qt_args = parser.parse_known_args()
+    if args.join is not None and args.connect is None:
+        parser.error("--join needs --connect")
+    startup_profile = StartupProfile() if args.startup_profile else None
+
+    if args.profile is not None or args.profile_port is not None:
+        profiling.enable(args.profile or "-", args.profile_port)
+    else:
+        profiling.enableFromEnvironment()
+    if profiling.enabled():
+        instrumentClasses()
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    if startup_profile is not None:
+        startup_profile.mark("application")
+
+    window = MainWindow()
+    if startup_profile is not None:
+        startup_profile.mark("window")
+        startup_profile.watch(window.board_manager.view.viewport())
+    window.board_manager.book_path = args.book
+    if args.connect is not None:
+        host, _, port = args.connect.rpartition(":")
+        window.remote_address = (host or "127.0.0.1", int(port))
+        window.open_record_action.setDisabled(True)
+        if args.join is not None:
+            seat = {"black": protocol.BLACK_SEAT, "white": protocol.WHITE_SEAT, "spectator": protocol.SPECTATOR}[args.seat]
+            window.joinRemoteGame(args.join, seat)
+    window.show()
+    # the icon is not needed for the first frame
+    QtCore.QTimer.singleShot(0, window.loadIcon)
+    if profiling.enabled():
+        instrumentWindow(window)
+    app.aboutToQuit.connect(window.board_manager.worker.shutdown)
+
+    if args.paint_stats:
+        paint_stats = PaintStats(window.board_manager.view.viewport())
+
+    app.exec()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import math
+import multiprocessing
+import random
+import sys
+import time
+import typing
+
+from color import Color, otherColor
+from bitboard import BitBoard, makesFive
+from engine import Game
+
+class Node:
+    __slots__ = ("move", "children", "untried", "visits", "wins")
+
+    def __init__(self, move: int):
+        self.move = move
+        self.children: list[Node] = []
+        self.untried: None|list[int] = None
+        self.visits = 0
+        # results for the player who made self.move: 1 per win, 0.5 per draw
+        self.wins = 0.0
+
+def nodeBytes(node: Node):
+    # approximate memory held by one node, for reporting and for the node cap
+    size = sys.getsizeof(node) + sys.getsizeof(node.children)
+    if node.untried is not None:
+        size += sys.getsizeof(node.untried)
+    return size
+
+class MCTSStats(typing.NamedTuple):
+    playouts: int
+    seconds: float
+    playouts_per_second: float
+    nodes: int
+    node_bytes: int
+
+class TreeSearch:
+    # One open-loop UCT tree: nodes are move sequences, and every pass through the tree samples
+    # the flip coin again, so a node stands for all the positions its moves can lead to.
+
+    def __init__(self, board: BitBoard, to_move: Color, flip_prob: float, rng: random.Random,
+                 max_nodes: int, exploration: float = 1.4):
+        self.board = board
+        self.to_move = to_move
+        self.flip_prob = flip_prob
+        self.rng = rng
+        self.max_nodes = max_nodes
+        self.exploration = exploration
+        self.root = Node(-1)
+        self.nodes = 1
+        self.playouts = 0
+        self.cells = [board.index(x, y) for x in range(board.size) for y in range(board.size)]
+        self.neighbors = {index: board.neighborhood(1 << index, 1) ^ (1 << index) for index in self.cells}
+
+    def candidates(self, masks: list[int]):
+        occupied = masks[0] | masks[1]
+        if not occupied:
+            center = self.board.size // 2
+            return [self.board.index(center, center)]
+        moves = list(self.board.cells(self.board.neighborhood(occupied, 2) & ~occupied))
+        self.rng.shuffle(moves)
+        return [self.board.index(x, y) for x, y in moves]
+
+    def apply(self, masks: list[int], index: int, to_move: Color):
+        # places a stone for to_move, flipping it with flip_prob; returns the winner if it makes five
+        color = otherColor(to_move) if self.rng.random() < self.flip_prob else to_move
+        masks[color.value] |= 1 << index
+        return color if makesFive(masks[color.value], index, self.board.shifts) else None
+
+    def select(self, node: Node):
+        log_visits = math.log(node.visits)
+        return max(node.children, key=lambda child:
+                   child.wins/child.visits + self.exploration*math.sqrt(log_visits/child.visits))
+
+    def iterate(self):
+        masks = self.board.masks[:]
+        to_move = self.to_move
+        node = self.root
+        path = [(node, to_move)]
+        winner = None
+
+        while True:
+            if node.untried is None:
+                node.untried = self.candidates(masks)
+            if node.untried and self.nodes < self.max_nodes:
+                child = Node(node.untried.pop())
+                node.children.append(child)
+                self.nodes += 1
+            elif node.children:
+                child = self.select(node)
+            else:
+                break
+
+            path.append((child, to_move))
+            winner = self.apply(masks, child.move, to_move)
+            to_move = otherColor(to_move)
+            node = child
+            if winner is not None or child.visits == 0:
+                break
+
+        if winner is None:
+            winner = self.rollout(masks, to_move)
+
+        self.playouts += 1
+        self.root.visits += 1
+        for node, mover in path[1:]:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == mover:
+                node.wins += 1.0
+
+    def rollout(self, masks: list[int], to_move: Color):
+        occupied = masks[0] | masks[1]
+        empty = [index for index in self.cells if not (occupied >> index) & 1]
+        while empty:
+            # prefer cells next to a stone, but fall back to any empty cell
+            for _ in range(3):
+                k = self.rng.randrange(len(empty))
+                if occupied & self.neighbors[empty[k]]:
+                    break
+            index = empty[k]
+            empty[k] = empty[-1]
+            empty.pop()
+            occupied |= 1 << index
+
+            winner = self.apply(masks, index, to_move)
+            if winner is not None:
+                return winner
+            to_move = otherColor(to_move)
+        return None
+
+    def run(self, seconds: float = math.inf, playouts: None|int = None,
+            should_stop: None|typing.Callable[[], bool] = None):
+        deadline = time.perf_counter() + seconds
+        while (playouts is None or self.playouts < playouts) and time.perf_counter() < deadline:
+            # at least one playout always runs, so there is a move to return
+            if should_stop is not None and self.playouts and self.playouts % 16 == 0 and should_stop():
+                break
+            self.iterate()
+        return {child.move: (child.visits, child.wins) for child in self.root.children}
+
+    def memoryBytes(self):
+        total = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            total += nodeBytes(node)
+            stack.extend(node.children)
+        return total
+
+def _searchWorker(args: tuple, should_stop: None|typing.Callable[[], bool] = None):
+    board, to_move, flip_prob, seed, max_nodes, seconds, playouts = args
+    tree = TreeSearch(board, to_move, flip_prob, random.Random(seed), max_nodes)
+    root_stats = tree.run(seconds, playouts, should_stop)
+    return root_stats, tree.playouts, tree.nodes, tree.memoryBytes()
+
+class MCTSPlayer:
+    # Monte Carlo tree search with flip-aware rollouts and root parallelism: every worker process
+    # grows its own tree from the same position with its own seed, and the root visit counts are
+    # summed. max_nodes caps the nodes of each tree, so memory stays bounded however long it runs.
+    #
+    # Like ExpectimaxPlayer, it starts from the fake board unless use_real_board is set.
+
+    def __init__(self, time_budget: float = 1.0, playouts: None|int = None, processes: int = 1,
+                 max_nodes: int = 200_000, use_real_board: bool = False, seed: None|int = None):
+        # worker processes cannot be stopped by should_stop, so they need a limit of their own
+        if processes > 1 and time_budget == math.inf and playouts is None:
+            raise ValueError("a search over several processes needs a time budget or a playout count")
+        self.time_budget = time_budget
+        self.playouts = playouts
+        self.processes = processes
+        self.max_nodes = max_nodes
+        self.use_real_board = use_real_board
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.last_stats: None|MCTSStats = None
+        # estimated chance that the side to move wins after the chosen move
+        self.last_win_rate = 0.5
+
+    def __call__(self, game: Game, rng: random.Random):
+        # lets the player take part in tournament.runTournament, seeded by the tournament
+        self.rng = rng
+        return self.chooseMove(game)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = None
+        return state
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def chooseMove(self, game: Game, should_stop: None|typing.Callable[[], bool] = None) -> tuple[int,int]:
+        # should_stop can cut the search short when running in-process (processes == 1)
+        board = game.real_board if self.use_real_board else game.fake_board
+        if not board.empty():
+            raise ValueError("no empty cell left")
+
+        playouts = None if self.playouts is None else -(-self.playouts // self.processes)
+        jobs = [(board.copy(), game.current_color, game.flip_prob, self.rng.getrandbits(64),
+                 self.max_nodes, self.time_budget, playouts) for _ in range(self.processes)]
+
+        start = time.perf_counter()
+        if self.processes == 1:
+            results = [_searchWorker(jobs[0], should_stop)]
+        else:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.processes)
+            results = self.pool.map(_searchWorker, jobs)
+        seconds = time.perf_counter() - start
+
+        visits: dict[int, int] = {}
+        wins: dict[int, float] = {}
+        for root_stats, _, _, _ in results:
+            for move, (count, won) in root_stats.items():
+                visits[move] = visits.get(move, 0) + count
+                wins[move] = wins.get(move, 0.0) + won
+
+        total_playouts = sum(result[1] for result in results)
+        self.last_stats = MCTSStats(total_playouts, seconds, total_playouts/seconds if seconds else 0.0,
+                                    sum(result[2] for result in results), sum(result[3] for result in results))
+
+        best = max(visits, key=visits.get)
+        self.last_win_rate = wins[best] / visits[best]
+        return board.coords(best)
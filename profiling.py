@@ -0,0 +1,194 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+
+# Opt-in instrumentation. Nothing here costs anything until enable() is called; after that, the
+# methods passed to instrument() record a latency histogram and the net memory they allocate,
+# countSignal() counts signal emissions and gauge() keeps the last and highest value of a quantity
+# such as the number of scene items. report() returns everything as a JSON-serializable dict; it
+# is written out at exit and can also be served on a local port while the app runs.
+#
+# The RANDGOMOKU_PROFILE environment variable turns it on without touching the command line:
+# "1" dumps the report to stderr at exit and any other value is taken as the file to write it to.
+# RANDGOMOKU_PROFILE_PORT additionally serves the report on http://127.0.0.1:<port>/.
+
+ENV_VAR = "RANDGOMOKU_PROFILE"
+PORT_ENV_VAR = "RANDGOMOKU_PROFILE_PORT"
+
+class Histogram:
+    # Latencies in power-of-two microsecond buckets: bucket b counts the calls that took less than
+    # 2**b microseconds (and at least 2**(b-1)).
+
+    def __init__(self):
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.allocated = 0
+
+    def record(self, seconds: float, allocated: int = 0):
+        bucket = int(seconds * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.allocated += allocated
+
+    def percentile(self, fraction: float):
+        # upper bound of the bucket holding the given fraction of calls, in microseconds
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= fraction * self.count:
+                return 1 << bucket
+        return 0
+
+    def report(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1e3,
+            "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+            "max_us": self.max * 1e6,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "allocated_bytes": self.allocated,
+            "buckets_us": {f"<{1 << bucket}": count for bucket, count in sorted(self.buckets.items())},
+        }
+
+class Profiler:
+    def __init__(self):
+        # the stats endpoint reads from another thread
+        self.lock = threading.Lock()
+        self.histograms: dict[str, Histogram] = {}
+        self.signals: dict[str, int] = {}
+        self.gauges: dict[str, tuple[float, float]] = {}
+        self.start_time = time.perf_counter()
+        self.start_snapshot: None|tracemalloc.Snapshot = None
+
+    def record(self, name: str, seconds: float, allocated: int = 0):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds, allocated)
+
+    def countSignal(self, name: str):
+        with self.lock:
+            self.signals[name] = self.signals.get(name, 0) + 1
+
+    def gauge(self, name: str, value: float):
+        with self.lock:
+            _, highest = self.gauges.get(name, (value, value))
+            self.gauges[name] = (value, max(value, highest))
+
+    def report(self, top_allocations: int = 0):
+        with self.lock:
+            result: dict[str, typing.Any] = {
+                "uptime_s": time.perf_counter() - self.start_time,
+                "latency": {name: histogram.report() for name, histogram in sorted(self.histograms.items())},
+                "signals": dict(sorted(self.signals.items())),
+                "gauges": {name: {"last": last, "max": highest} for name, (last, highest) in sorted(self.gauges.items())},
+            }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            result["memory"] = {"traced_bytes": current, "peak_bytes": peak}
+            if top_allocations and self.start_snapshot is not None:
+                # allocation growth since enable(), by source line
+                stats = tracemalloc.take_snapshot().compare_to(self.start_snapshot, "lineno")
+                result["memory"]["top_deltas"] = [
+                    {"where": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                    for stat in stats[:top_allocations]]
+        return result
+
+profiler: None|Profiler = None
+
+def enabled():
+    return profiler is not None
+
+def enable(output: str = "-", port: None|int = None):
+    # output is a file path, or "-" for stderr; the report is written there at exit
+    global profiler
+    if profiler is not None:
+        return profiler
+    tracemalloc.start()
+    profiler = Profiler()
+    profiler.start_snapshot = tracemalloc.take_snapshot()
+    atexit.register(dump, output)
+    if port is not None:
+        serve(port)
+    return profiler
+
+def enableFromEnvironment():
+    # returns whether the environment asked for profiling
+    output = os.environ.get(ENV_VAR, "")
+    if not output:
+        return False
+    port = os.environ.get(PORT_ENV_VAR)
+    enable("-" if output == "1" else output, int(port) if port else None)
+    return True
+
+def dump(output: str = "-"):
+    if profiler is None:
+        return
+    text = json.dumps(profiler.report(top_allocations=15), indent=2)
+    if output == "-":
+        print(text, file=sys.stderr)
+    else:
+        with open(output, "w") as file:
+            file.write(text)
+
+def instrument(owner: typing.Any, attribute: str, name: None|str = None):
+    # Replaces owner.attribute (a class or an instance) with a wrapper that records every call
+    # under name. Does nothing unless profiling is enabled.
+    if profiler is None:
+        return
+    method = getattr(owner, attribute)
+    name = name or f"{getattr(owner, '__name__', type(owner).__name__)}.{attribute}"
+
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        allocated = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            typing.cast(Profiler, profiler).record(name, seconds, tracemalloc.get_traced_memory()[0] - allocated)
+
+    setattr(owner, attribute, timed)
+
+def countSignal(name: str):
+    if profiler is not None:
+        profiler.countSignal(name)
+
+def gauge(name: str, value: float):
+    if profiler is not None:
+        profiler.gauge(name, value)
+
+def serve(port: int):
+    # GET / returns the report, GET /memory adds the top allocation deltas (slower)
+    import http.server
+
+    class StatsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(typing.cast(Profiler, profiler).report(top_allocations=15 if self.path == "/memory" else 0),
+                              indent=2).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), StatsHandler)
+    threading.Thread(target=server.serve_forever, name="profiling-server", daemon=True).start()
+    return server
@@ -0,0 +1,97 @@
+import array
+import struct
+import sys
+import typing
+
+from color import Color
+
+# Wire protocol between server.py and its clients. Every message is a frame: FRAME_HEADER (message
+# type, payload length) followed by the payload. Moves travel as little-endian 16-bit codes like
+# those of record.py. While a game runs they are live codes, cell << 2 | real board has a four
+# << 1 | fake is white, so clients see the fake board and the four-in-a-row warning but never the
+# real colors; ENDED reveals the real colors with the codes of record.py.
+
+FRAME_HEADER = struct.Struct("<BH")
+MAX_PAYLOAD = 0xFFFF
+
+# client -> server
+CREATE = 1      # CREATE_PAYLOAD; the creator takes the black seat
+JOIN = 2        # JOIN_PAYLOAD
+MOVE = 3        # MOVE_PAYLOAD
+RESIGN = 4      # empty
+
+# server -> client
+JOINED = 16     # JOINED_PAYLOAD
+STATE = 17      # STATE_PAYLOAD, then the live codes of the moves so far
+MOVED = 18      # MOVE_PAYLOAD holding a live code
+ENDED = 19      # ENDED_PAYLOAD, then the record.py codes of all moves
+ERROR = 20      # UTF-8 message
+
+CREATE_PAYLOAD = struct.Struct("<HH")   # board size, flip probability in FLIP_SCALE units
+JOIN_PAYLOAD = struct.Struct("<IB")     # game id, seat
+MOVE_PAYLOAD = struct.Struct("<H")      # move code
+JOINED_PAYLOAD = struct.Struct("<IBHH") # game id, seat, board size, flip probability
+STATE_PAYLOAD = struct.Struct("<B")     # winner
+ENDED_PAYLOAD = struct.Struct("<B")     # winner
+
+FLIP_SCALE = 10000
+BLACK_SEAT = 0
+WHITE_SEAT = 1
+SPECTATOR = 2
+# winner byte
+NO_WINNER = 0
+WINNERS = {NO_WINNER: None, 1: Color.BLACK, 2: Color.WHITE}
+
+class ProtocolError(Exception): pass
+
+def frame(kind: int, payload: bytes = b""):
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError("payload too large")
+    return FRAME_HEADER.pack(kind, len(payload)) + payload
+
+def winnerByte(winner: None|Color):
+    return NO_WINNER if winner is None else winner.value + 1
+
+def flipToWire(flip_prob: float):
+    return round(min(max(flip_prob, 0.0), 1.0) * FLIP_SCALE)
+
+def flipFromWire(value: int):
+    return value / FLIP_SCALE
+
+def liveCode(x: int, y: int, fake_color: Color, four: bool, size: int):
+    return (x*size+y) << 2 | four << 1 | fake_color.value
+
+def decodeLiveCode(code: int, size: int) -> tuple[int, int, Color, bool]:
+    x, y = divmod(code >> 2, size)
+    return x, y, (Color.BLACK, Color.WHITE)[code & 1], bool(code & 2)
+
+def codesToBytes(codes: array.array):
+    if sys.byteorder == "big":
+        codes = array.array("H", codes)
+        codes.byteswap()
+    return codes.tobytes()
+
+def decodeLiveCodes(data: bytes, size: int):
+    codes = array.array("H")
+    codes.frombytes(data)
+    if sys.byteorder == "big":
+        codes.byteswap()
+    return [decodeLiveCode(code, size) for code in codes]
+
+class FrameReader:
+    # Splits a byte stream into (type, payload) frames, for clients that receive data in
+    # arbitrary chunks (the asyncio server reads whole frames with readexactly instead).
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> typing.Iterator[tuple[int, bytes]]:
+        self.buffer += data
+        while len(self.buffer) >= FRAME_HEADER.size:
+            kind, length = FRAME_HEADER.unpack_from(self.buffer)
+            end = FRAME_HEADER.size + length
+            if len(self.buffer) < end:
+                return
+            payload = bytes(self.buffer[FRAME_HEADER.size:end])
+            del self.buffer[:end]
+            yield kind, payload
@@ -0,0 +1,40 @@
+import random
+import typing
+
+from engine import Game, DuplicatePositionError, GameAlreadyEndedError
+
+# Random games for the playground checks. Besides playing they undo, redo, jump and switch
+# between variations, so whatever a game keeps up to date incrementally goes through every kind
+# of change.
+
+def randomWalk(game: Game, rng: random.Random, steps: int):
+    # yields after every step that changed the game
+    size = game.SIZE
+    for _ in range(steps):
+        r = rng.random()
+        try:
+            if r < 0.6:
+                game.play(rng.randrange(size), rng.randrange(size))
+            elif r < 0.7:
+                game.prevMove()
+            elif r < 0.8:
+                game.nextMove()
+            elif r < 0.9:
+                # playing after the jump starts another variation
+                game.gotoMove(rng.randint(0, len(game.history)))
+            else:
+                game.switchVariation(rng.choice((-1, 1)))
+        except (DuplicatePositionError, GameAlreadyEndedError, IndexError):
+            continue
+        yield
+
+def randomGames(check: typing.Callable[[Game], None], seed: int, games: int, steps: int,
+                sizes: tuple[int, ...], flip_prob: float = 0.3) -> typing.Iterator[Game]:
+    # calls check after every step of every game and yields each game once it is over
+    rng = random.Random(seed)
+    for n in range(games):
+        game = Game(seed=n, size=rng.choice(sizes))
+        game.flip_prob = flip_prob
+        for _ in randomWalk(game, rng, steps):
+            check(game)
+        yield game
@@ -0,0 +1,82 @@
+import struct
+import typing
+
+from color import Color
+from engine import Game
+from history import MoveHistory, MAX_PACKED_SIZE
+
+# File layout: MAGIC, then any number of games appended back to back. Each game is GAME_HEADER
+# (flip_prob, RNG seed, board size, move count) followed by one little-endian uint16 per move:
+# cell index (x*size+y) << 2 | real is white << 1 | fake is white, the codes of history.py.
+MAGIC = b"RGMKREC1"
+GAME_HEADER = struct.Struct("<dQHI")
+MAX_SIZE = MAX_PACKED_SIZE
+
+class RecordFormatError(Exception): pass
+
+class GameRecord(typing.NamedTuple):
+    flip_prob: float
+    seed: int
+    size: int
+    # two bytes per move, decoded when read
+    moves: MoveHistory
+
+def encodeMoves(moves: typing.Iterable[tuple[int,int,Color,Color]], size: int):
+    if not isinstance(moves, MoveHistory) or moves.size != size:
+        moves = MoveHistory(size, moves)
+    return moves.toBytes()
+
+def decodeMoves(data: bytes, size: int):
+    return MoveHistory.fromBytes(data, size)
+
+def encodeGame(game: Game):
+    if game.SIZE > MAX_SIZE:
+        raise ValueError(f"boards larger than {MAX_SIZE} cannot be recorded")
+    moves = game.history.toBytes()
+    return GAME_HEADER.pack(game.flip_prob, game.seed, game.SIZE, len(game.history)) + moves
+
+class RecordWriter:
+    # Appends games to a record file, writing the file header if the file is new or empty.
+
+    def __init__(self, path: str):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def writeGame(self, game: Game):
+        self.file.write(encodeGame(game))
+
+    def writeEncoded(self, data: bytes):
+        # data as produced by encodeGame, e.g. sent back by a worker process
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def readGames(path: str) -> typing.Iterator[GameRecord]:
+    # Yields the games in a record file one at a time, so archives of any size can be scanned.
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise RecordFormatError(f"{path} is not a RandGomoku record file")
+
+        while header := file.read(GAME_HEADER.size):
+            if len(header) != GAME_HEADER.size:
+                raise RecordFormatError("truncated game header")
+            flip_prob, seed, size, count = GAME_HEADER.unpack(header)
+            if not 1 <= size <= MAX_SIZE:
+                raise RecordFormatError(f"unsupported board size {size}")
+
+            data = file.read(2*count)
+            if len(data) != 2*count:
+                raise RecordFormatError("truncated move list")
+            try:
+                moves = decodeMoves(data, size)
+            except IndexError:
+                raise RecordFormatError("move off the board")
+            yield GameRecord(flip_prob, seed, size, moves)
@@ -0,0 +1,246 @@
+import argparse
+import array
+import asyncio
+import itertools
+import struct
+
+from color import Color, otherColor
+from engine import Game, DuplicatePositionError, GameAlreadyEndedError
+import protocol
+import record
+
+# Multiplayer server. It owns the authoritative engine of every game and tosses the flip coin
+# itself, so clients only ever see the fake board until a game ends. One process serves many
+# games on one event loop: a game is an engine plus its seats, it is dropped as soon as nobody is
+# connected to it, and max_games caps how many exist at once.
+#
+# Broadcasts never wait for a slow client. Frames go into the client's transport buffer, and a
+# client whose buffer grows past max_buffer bytes is disconnected instead of being buffered for
+# without bound; it can join again and gets the full state. Reading from a client pauses while
+# its own replies cannot be flushed.
+
+class Connection:
+    __slots__ = ("writer", "game", "seat")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.game: None|ServerGame = None
+        self.seat = protocol.SPECTATOR
+
+class ServerGame:
+    __slots__ = ("id", "engine", "live_codes", "seats", "spectators")
+
+    def __init__(self, game_id: int, size: int, flip_prob: float):
+        self.id = game_id
+        self.engine = Game(size=size)
+        self.engine.flip_prob = flip_prob
+        # protocol.liveCode of every move, two bytes each
+        self.live_codes = array.array("H")
+        self.seats: list[None|Connection] = [None, None]
+        self.spectators: set[Connection] = set()
+
+    def connections(self):
+        return [seat for seat in self.seats if seat is not None] + list(self.spectators)
+
+    def stateFrames(self):
+        # what a newly joined client needs to catch up
+        engine = self.engine
+        if engine.winner is not None:
+            return self.endedFrame()
+        return protocol.frame(protocol.STATE, protocol.STATE_PAYLOAD.pack(protocol.NO_WINNER)
+                              + protocol.codesToBytes(self.live_codes))
+
+    def endedFrame(self):
+        engine = self.engine
+        return protocol.frame(protocol.ENDED, protocol.ENDED_PAYLOAD.pack(protocol.winnerByte(engine.winner))
+                              + engine.history.toBytes())
+
+class GameServer:
+    MIN_SIZE = 5
+
+    def __init__(self, max_games: int = 10_000, max_buffer: int = 256*1024):
+        self.max_games = max_games
+        self.max_buffer = max_buffer
+        self.games: dict[int, ServerGame] = {}
+        self.ids = itertools.count(1)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        # port 0 picks a free port; see the returned server's sockets
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(writer)
+        try:
+            while True:
+                header = await reader.readexactly(protocol.FRAME_HEADER.size)
+                kind, length = protocol.FRAME_HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                try:
+                    self.dispatch(connection, kind, payload)
+                except (protocol.ProtocolError, struct.error) as error:
+                    self.send(connection, protocol.frame(protocol.ERROR, str(error).encode()))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.leave(connection)
+            writer.close()
+
+    def send(self, connection: Connection, data: bytes):
+        writer = connection.writer
+        if writer.is_closing():
+            return
+        writer.write(data)
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            writer.close()
+
+    def broadcast(self, game: ServerGame, data: bytes):
+        for connection in game.connections():
+            self.send(connection, data)
+
+    def error(self, connection: Connection, message: str):
+        self.send(connection, protocol.frame(protocol.ERROR, message.encode()))
+
+    def dispatch(self, connection: Connection, kind: int, payload: bytes):
+        if kind == protocol.CREATE:
+            size, flip = protocol.CREATE_PAYLOAD.unpack(payload)
+            self.create(connection, size, protocol.flipFromWire(flip))
+        elif kind == protocol.JOIN:
+            game_id, seat = protocol.JOIN_PAYLOAD.unpack(payload)
+            self.join(connection, game_id, seat)
+        elif kind == protocol.MOVE:
+            (code,) = protocol.MOVE_PAYLOAD.unpack(payload)
+            self.move(connection, code >> 2)
+        elif kind == protocol.RESIGN:
+            self.resign(connection)
+        else:
+            raise protocol.ProtocolError(f"unknown message type {kind}")
+
+    def create(self, connection: Connection, size: int, flip_prob: float):
+        if not self.MIN_SIZE <= size <= record.MAX_SIZE:
+            return self.error(connection, f"board size must be between {self.MIN_SIZE} and {record.MAX_SIZE}")
+        if len(self.games) >= self.max_games:
+            return self.error(connection, "the server is full")
+        game = ServerGame(next(self.ids), size, flip_prob)
+        self.games[game.id] = game
+        self.join(connection, game.id, protocol.BLACK_SEAT)
+
+    def join(self, connection: Connection, game_id: int, seat: int):
+        game = self.games.get(game_id)
+        if game is None:
+            return self.error(connection, f"no game {game_id}")
+        if seat not in (protocol.BLACK_SEAT, protocol.WHITE_SEAT, protocol.SPECTATOR):
+            return self.error(connection, f"no seat {seat}")
+        if seat != protocol.SPECTATOR and game.seats[seat] not in (None, connection):
+            return self.error(connection, "the seat is taken")
+
+        if connection.game is not game:
+            self.leave(connection)
+        if seat == protocol.SPECTATOR:
+            game.spectators.add(connection)
+        else:
+            game.seats[seat] = connection
+        connection.game = game
+        connection.seat = seat
+
+        engine = game.engine
+        self.send(connection, protocol.frame(protocol.JOINED, protocol.JOINED_PAYLOAD.pack(
+            game.id, seat, engine.SIZE, protocol.flipToWire(engine.flip_prob))))
+        self.send(connection, game.stateFrames())
+
+    def move(self, connection: Connection, cell: int):
+        game = connection.game
+        if game is None:
+            return self.error(connection, "not in a game")
+        engine = game.engine
+        if connection.seat != engine.current_color.value or engine.winner is not None:
+            return self.error(connection, "not your turn")
+
+        x, y = divmod(cell, engine.SIZE)
+        try:
+            engine.play(x, y)
+        except (DuplicatePositionError, GameAlreadyEndedError, IndexError):
+            return self.error(connection, "illegal move")
+
+        x, y, _, fake_color = engine.history[-1]
+        code = protocol.liveCode(x, y, fake_color, engine.checkForFourInARow(), engine.SIZE)
+        game.live_codes.append(code)
+        self.broadcast(game, protocol.frame(protocol.MOVED, protocol.MOVE_PAYLOAD.pack(code)))
+        if engine.winner is not None:
+            self.broadcast(game, game.endedFrame())
+
+    def resign(self, connection: Connection):
+        game = connection.game
+        if game is None or connection.seat == protocol.SPECTATOR or game.engine.winner is not None:
+            return self.error(connection, "nothing to resign")
+        game.engine.winner = otherColor(Color(connection.seat))
+        self.broadcast(game, game.endedFrame())
+
+    def leave(self, connection: Connection):
+        game = connection.game
+        if game is None:
+            return
+        connection.game = None
+        if connection.seat == protocol.SPECTATOR:
+            game.spectators.discard(connection)
+        elif game.seats[connection.seat] is connection:
+            game.seats[connection.seat] = None
+        if not game.connections():
+            del self.games[game.id]
+
+class Client:
+    # Minimal asyncio client, for bots and for exercising a server over loopback.
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host: str, port: int):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def send(self, kind: int, payload: bytes = b""):
+        self.writer.write(protocol.frame(kind, payload))
+        await self.writer.drain()
+
+    async def create(self, size: int = Game.SIZE, flip_prob: float = 0.1):
+        await self.send(protocol.CREATE, protocol.CREATE_PAYLOAD.pack(size, protocol.flipToWire(flip_prob)))
+
+    async def join(self, game_id: int, seat: int):
+        await self.send(protocol.JOIN, protocol.JOIN_PAYLOAD.pack(game_id, seat))
+
+    async def move(self, x: int, y: int, size: int):
+        # the server only reads the cell of the code
+        await self.send(protocol.MOVE, protocol.MOVE_PAYLOAD.pack(protocol.liveCode(x, y, Color.BLACK, False, size)))
+
+    async def resign(self):
+        await self.send(protocol.RESIGN)
+
+    async def receive(self) -> tuple[int, bytes]:
+        kind, length = protocol.FRAME_HEADER.unpack(await self.reader.readexactly(protocol.FRAME_HEADER.size))
+        return kind, await self.reader.readexactly(length)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def serve(host: str, port: int, max_games: int):
+    server = await GameServer(max_games).start(host, port)
+    for sock in server.sockets:
+        print(f"serving on {sock.getsockname()}")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="RandGomoku game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-games", type=int, default=10_000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_games))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
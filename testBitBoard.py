@@ -0,0 +1,48 @@
+from color import Color
+from engine import Game
+from randomgames import randomGames
+
+# Checks the masks of a game's bitboards against the moves they were built from after every step
+# of random games.
+
+DIRECTIONS = ((1,0), (0,1), (1,1), (1,-1))
+
+def startsFive(colors: dict[tuple[int,int], Color], x: int, y: int, color: Color):
+    return any(all(colors.get((x+k*dx, y+k*dy)) == color for k in range(5)) for dx, dy in DIRECTIONS)
+
+def makesFive(colors: dict[tuple[int,int], Color], x: int, y: int, color: Color):
+    # whether a stone of color at (x,y) would be in five or more in a row
+    for dx, dy in DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+            i, j = x+sign*dx, y+sign*dy
+            while colors.get((i, j)) == color:
+                count += 1
+                i, j = i+sign*dx, j+sign*dy
+        if count >= 5:
+            return True
+    return False
+
+def check(game: Game):
+    moves = list(game.history[:game.history_pointer])
+    for board, colors in ((game.real_board, {(x, y): real for x, y, real, _ in moves}),
+                          (game.fake_board, {(x, y): fake for x, y, _, fake in moves})):
+        width = board.width
+        for color in Color:
+            mask = sum(1 << (x*width + y) for (x, y), c in colors.items() if c == color)
+            assert board.masks[color.value] == mask, (color, bin(board.masks[color.value]), bin(mask))
+        assert {board.coords(index): color for index, color in board.colors.items()} == colors
+        assert all(board.get(x, y) == colors.get((x, y)) for x in range(board.size) for y in range(board.size))
+
+        empty = {(x, y) for x in range(board.size) for y in range(board.size)} - colors.keys()
+        assert set(board.cells(board.empty())) == empty
+        for color in Color:
+            fours = {(x, y) for x, y in empty if makesFive(colors, x, y, color)}
+            assert set(board.cells(board.fourMask(color))) == fours
+            fives = {(x, y) for x, y in board.cells(board.stones(color)) if startsFive(colors, x, y, color)}
+            assert set(board.cells(board.fiveMask(color))) == fives
+
+if __name__ == "__main__":
+    for game in randomGames(check, seed=3, games=40, steps=150, sizes=(5, 7, 9, 15, 20)):
+        check(game.copy())
+    print("ok")
@@ -0,0 +1,70 @@
+import atexit
+import json
+import os
+import tempfile
+import urllib.request
+
+from PyQt5 import QtCore
+
+import profiling
+from engine import Game
+
+# Checks the opt-in profiling: histogram buckets, instrumented calls, signal counts, gauges, the
+# stats endpoint and the report written at exit.
+
+def fetch(port: int, path: str):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as response:
+        return json.load(response)
+
+if __name__ == "__main__":
+    app = QtCore.QCoreApplication([])
+    directory = tempfile.mkdtemp()
+    output = os.path.join(directory, "profile.json")
+    assert not profiling.enabled()
+    profiler = profiling.enable(output)
+
+    histogram = profiling.Histogram()
+    for seconds in (0.5e-6, 3e-6, 3e-6, 100e-6):
+        histogram.record(seconds)
+    report = histogram.report()
+    assert report["count"] == 4 and report["buckets_us"] == {"<1": 1, "<4": 2, "<128": 1}, report
+    assert report["p50_us"] == 4 and report["p99_us"] == 128
+
+    # main only adds the wrappers and signal counting once profiling is enabled
+    import main
+    main.instrumentClasses()
+    game = Game(seed=1)
+    for x in range(5):
+        game.play(x, 0)
+    assert profiler.histograms["Game.play"].count == 5
+
+    # counts its own signals when created with profiling on
+    manager = main.GameManager()
+    manager.play(7, 7)
+    manager.play(7, 8)
+    manager.emitBoardChangedSignals()
+    assert profiler.histograms["Game.play"].count == 7
+    assert profiler.histograms["GameManager.emitBoardChangedSignals"].count == 1
+    assert profiler.signals["GameManager.engine_changed_signal"] == 2
+    assert profiler.signals["GameManager.board_update_signal"] == 1
+
+    profiling.gauge("board.pieces", 3)
+    profiling.gauge("board.pieces", 1)
+
+    server = profiling.serve(0)
+    port = server.server_address[1]
+    served = fetch(port, "/")
+    assert served["latency"]["Game.play"]["count"] == 7
+    assert served["signals"]["GameManager.engine_changed_signal"] == 2
+    assert served["gauges"]["board.pieces"] == {"last": 1, "max": 3}
+    assert "top_deltas" not in served["memory"] and "top_deltas" in fetch(port, "/memory")["memory"]
+    server.shutdown()
+
+    profiling.dump(output)
+    atexit.unregister(profiling.dump)
+    with open(output) as file:
+        dumped = json.load(file)
+    assert dumped["latency"]["Game.play"]["count"] == 7 and dumped["signals"] == served["signals"]
+    os.remove(output)
+    os.rmdir(directory)
+    print("ok")
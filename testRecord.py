@@ -0,0 +1,56 @@
+import array
+import os
+import tempfile
+
+import book
+import record
+from engine import Game
+from history import MoveHistory
+
+# Checks that record files round-trip and that corrupt ones are refused before they reach a game
+# or an opening book.
+
+def writeRecord(path: str, size: int, codes: list[int]):
+    with open(path, "wb") as file:
+        file.write(record.MAGIC)
+        file.write(record.GAME_HEADER.pack(0.1, 7, size, len(codes)))
+        file.write(array.array("H", codes).tobytes())
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "game.rgr")
+
+    game = Game(seed=3, size=9)
+    game.flip_prob = 0.3
+    for x, y in ((4, 4), (0, 0), (4, 5), (8, 8), (4, 6)):
+        game.play(x, y)
+    with record.RecordWriter(path) as writer:
+        writer.writeGame(game)
+    (loaded,) = record.readGames(path)
+    assert loaded.moves == game.history and (loaded.size, loaded.seed) == (9, 3)
+
+    # cell 162 is past the 81 cells of a 9x9 board
+    writeRecord(path, 9, [(4*9+4) << 2, 162 << 2])
+    try:
+        list(record.readGames(path))
+        assert False, "corrupt record read"
+    except record.RecordFormatError:
+        pass
+    try:
+        book.BookBuilder(9).addRecords(path)
+        assert False, "corrupt record taken into a book"
+    except record.RecordFormatError:
+        pass
+
+    # a history built from unchecked codes is refused by load, which leaves the game as it was
+    before = list(game.history), game.history_pointer, game.real_hash
+    try:
+        game.load(MoveHistory.fromCodes(9, [162 << 2]), 0.1, 7)
+        assert False, "off-board move loaded"
+    except IndexError:
+        pass
+    assert (list(game.history), game.history_pointer, game.real_hash) == before
+
+    os.remove(path)
+    os.rmdir(directory)
+    print("ok")
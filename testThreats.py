@@ -0,0 +1,57 @@
+from color import Color
+from engine import Game
+from randomgames import randomGames
+from threats import ThreatIndex
+
+# Checks the incremental ThreatIndex of a game against a recount of the whole board after every
+# step of random games.
+
+def bruteFours(board, color: Color):
+    # empty cells where a stone of color makes five or more in a row
+    cells = set()
+    for x, y in board.cells(board.empty()):
+        for dx, dy in ThreatIndex.DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                i, j = x+sign*dx, y+sign*dy
+                while 0 <= i < board.size and 0 <= j < board.size and board.get(i, j) == color:
+                    count += 1
+                    i, j = i+sign*dx, j+sign*dy
+            if count >= 5:
+                cells.add((x, y))
+    return cells
+
+def bruteOpenThrees(board, color: Color):
+    # windows _????_ with three stones of color and one empty cell inside, and those empty cells
+    size = board.size
+    count = 0
+    cells = set()
+    for x in range(size):
+        for y in range(size):
+            for dx, dy in ThreatIndex.DIRECTIONS:
+                window = [(x+k*dx, y+k*dy) for k in range(6)]
+                if not all(0 <= i < size and 0 <= j < size for i, j in window):
+                    continue
+                values = [board.get(i, j) for i, j in window]
+                inside = values[1:5]
+                if values[0] is None and values[5] is None and inside.count(color) == 3 and inside.count(None) == 1:
+                    count += 1
+                    cells.add(window[1 + inside.index(None)])
+    return count, cells
+
+def check(game: Game):
+    for board, index in ((game.real_board, game.threats), (game.fake_board, game.fake_threats)):
+        for color in Color:
+            fours = bruteFours(board, color)
+            assert index.fourCells(color) == fours, (color, index.fourCells(color), fours)
+            assert index.hasFour(color) == bool(fours)
+            count, cells = bruteOpenThrees(board, color)
+            assert index.openThreeCount(color) == count, (color, index.openThreeCount(color), count)
+            assert index.openThreeCells(color) == cells, (color, index.openThreeCells(color), cells)
+    assert game.checkForFourInARow() == bool(bruteFours(game.real_board, Color.BLACK) | bruteFours(game.real_board, Color.WHITE))
+
+if __name__ == "__main__":
+    for game in randomGames(check, seed=1, games=30, steps=100, sizes=(7, 9, 15)):
+        # a copy builds its indexes from the copied boards
+        check(game.copy())
+    print("ok")
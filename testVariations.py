@@ -0,0 +1,49 @@
+import pickle
+
+from engine import Game
+from randomgames import randomGames
+
+# Checks the variation tree of a game against its history after every step of random games, and
+# that every line played stays in the tree.
+
+def check(game: Game):
+    assert len(game.line) == len(game.history)
+    parent = game.root
+    for depth, node in enumerate(game.line, 1):
+        assert node.code == game.history.codes[depth-1]
+        assert node.parent is parent and node.depth == depth
+        # redo follows the line
+        assert parent.selected is node
+        parent = node
+
+    # the position is the history replayed up to the pointer
+    replay = Game(size=game.SIZE)
+    for x, y, real_color, fake_color in game.history[:game.history_pointer]:
+        replay.setCell(x, y, real_color, fake_color)
+    assert game.real_board.colors == replay.real_board.colors
+    assert game.fake_board.colors == replay.fake_board.colors
+    assert game.real_hash == replay.real_hash and game.fake_hash == replay.fake_hash
+    assert game.currentNode() is (game.line[game.history_pointer-1] if game.history_pointer else game.root)
+
+def findLine(game: Game, codes: tuple[int, ...]):
+    node = game.root
+    for code in codes:
+        node = next(child for child in node.children if child.code == code)
+    return node
+
+if __name__ == "__main__":
+    lines = set()
+    def checkLine(game: Game):
+        check(game)
+        lines.add(tuple(game.history.codes))
+
+    for game in randomGames(checkLine, seed=2, games=40, steps=200, sizes=(7, 9, 15)):
+        for codes in lines:
+            findLine(game, codes)
+        lines.clear()
+
+        # the tree is rebuilt from the current line when pickled
+        copy = pickle.loads(pickle.dumps(game))
+        check(copy)
+        assert copy.history == game.history and copy.history_pointer == game.history_pointer
+    print("ok")
@@ -0,0 +1,153 @@
+import typing
+
+from color import Color
+from bitboard import BitBoard
+
+# Cell states in window codes: two bits per cell, the first cell of a window in the lowest bits.
+EMPTY_STATE = 0
+OFF_BOARD = 3
+
+_STATES = {None: EMPTY_STATE, Color.BLACK: Color.BLACK.value + 1, Color.WHITE: Color.WHITE.value + 1}
+
+def _fourTable():
+    # five-cell windows holding four stones of one color and one empty cell, e.g. XX_XX or XXXX_:
+    # code -> (color value, offset of the empty cell)
+    table: dict[int, tuple[int, int]] = {}
+    for color in Color:
+        for gap in range(5):
+            code = 0
+            for k in range(5):
+                code |= (EMPTY_STATE if k == gap else color.value + 1) << 2*k
+            table[code] = (color.value, gap)
+    return table
+
+def _openThreeTable():
+    # six-cell windows with empty ends whose four inner cells hold three stones of one color and
+    # one empty cell, e.g. _XX_X_ or _XXX__: playing the empty inner cell makes an open four.
+    # code -> (color value, offset of that cell)
+    table: dict[int, tuple[int, int]] = {}
+    for color in Color:
+        for gap in range(1, 5):
+            code = 0
+            for k in range(1, 5):
+                code |= (EMPTY_STATE if k == gap else color.value + 1) << 2*k
+            table[code] = (color.value, gap)
+    return table
+
+FOUR_TABLE = _fourTable()
+OPEN_THREE_TABLE = _openThreeTable()
+
+class Threats(typing.NamedTuple):
+    # cells, as (x, y), that complete a five and that turn an open three into an open four
+    fours: set[tuple[int,int]]
+    open_threes: set[tuple[int,int]]
+
+class ThreatIndex:
+    # Fours (including split ones like XX_XX) and open threes on one BitBoard, kept up to date by
+    # calling update(x, y) after every change of a cell. An update only looks at the windows of the
+    # four lines through that cell and classifies each with a table lookup, so keeping the index
+    # costs the same on any board size and asking whether a color has a four is O(1).
+    #
+    # Threats are stored per window, keyed by window start index*4 + direction, as (color value,
+    # key cell index); per-color cell counts make the set of threatening cells cheap to list.
+
+    DIRECTIONS = ((1,0), (0,1), (1,1), (1,-1))
+
+    def __init__(self, board: BitBoard):
+        self.board = board
+        self.size = board.size
+        self.four_windows: dict[int, tuple[int, int]] = {}
+        self.three_windows: dict[int, tuple[int, int]] = {}
+        # per color value: key cell index -> number of windows
+        self.four_cells: list[dict[int, int]] = [{}, {}]
+        self.three_cells: list[dict[int, int]] = [{}, {}]
+        self.four_counts = [0, 0]
+        self.three_counts = [0, 0]
+        for x, y in board.cells(board.masks[0] | board.masks[1]):
+            self.update(x, y)
+
+    def copy(self, board: BitBoard):
+        # the same index for board, a copy of the board this one follows
+        index = ThreatIndex.__new__(ThreatIndex)
+        index.board = board
+        index.size = self.size
+        index.four_windows = self.four_windows.copy()
+        index.three_windows = self.three_windows.copy()
+        index.four_cells = [cells.copy() for cells in self.four_cells]
+        index.three_cells = [cells.copy() for cells in self.three_cells]
+        index.four_counts = self.four_counts[:]
+        index.three_counts = self.three_counts[:]
+        return index
+
+    def update(self, x: int, y: int):
+        colors, width, size = self.board.colors, self.board.width, self.size
+        four_windows, three_windows = self.four_windows, self.three_windows
+        center = x*width + y
+        for d, (dx, dy) in enumerate(self.DIRECTIONS):
+            step = dx*width + dy
+            # states of the cells from 5 steps before (x,y) to 5 steps after it on this line
+            low, high = -5, 5
+            if dx:
+                low, high = max(low, -x), min(high, size-1-x)
+            if dy == 1:
+                low, high = max(low, -y), min(high, size-1-y)
+            elif dy == -1:
+                low, high = max(low, y-size+1), min(high, y)
+            states = ([OFF_BOARD]*(low+5) + [_STATES[colors.get(center + t*step)] for t in range(low, high+1)]
+                      + [OFF_BOARD]*(5-high))
+
+            for s in range(6):
+                if states[s] == OFF_BOARD:
+                    # no threat can start off the board, and the key would not be unique
+                    continue
+                key = (center + (s-5)*step)*4 + d
+                code = states[s] | states[s+1] << 2 | states[s+2] << 4 | states[s+3] << 6 | states[s+4] << 8
+                # most windows hold no threat before or after, skip those without a call
+                if s:
+                    threat = FOUR_TABLE.get(code)
+                    if threat is not None or key in four_windows:
+                        self.replace(four_windows, self.four_cells, self.four_counts, key, step, threat)
+                threat = OPEN_THREE_TABLE.get(code | states[s+5] << 10)
+                if threat is not None or key in three_windows:
+                    self.replace(three_windows, self.three_cells, self.three_counts, key, step, threat)
+
+    @staticmethod
+    def replace(windows: dict[int, tuple[int, int]], cells: list[dict[int, int]], counts: list[int],
+                key: int, step: int, threat: None|tuple[int, int]):
+        old = windows.pop(key, None)
+        if old is not None:
+            color_value, cell = old
+            counts[color_value] -= 1
+            remaining = cells[color_value][cell] - 1
+            if remaining:
+                cells[color_value][cell] = remaining
+            else:
+                del cells[color_value][cell]
+        if threat is not None:
+            color_value, offset = threat
+            cell = (key >> 2) + offset*step
+            windows[key] = (color_value, cell)
+            counts[color_value] += 1
+            cells[color_value][cell] = cells[color_value].get(cell, 0) + 1
+
+    def hasFour(self, color: None|Color = None):
+        if color is None:
+            return bool(self.four_windows)
+        return self.four_counts[color.value] > 0
+
+    def fourCount(self, color: Color):
+        return self.four_counts[color.value]
+
+    def openThreeCount(self, color: Color):
+        return self.three_counts[color.value]
+
+    def fourCells(self, color: Color):
+        # empty cells where color would make five
+        return {self.board.coords(cell) for cell in self.four_cells[color.value]}
+
+    def openThreeCells(self, color: Color):
+        # empty cells where color would make an open four
+        return {self.board.coords(cell) for cell in self.three_cells[color.value]}
+
+    def threats(self, color: Color):
+        return Threats(self.fourCells(color), self.openThreeCells(color))
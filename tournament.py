@@ -0,0 +1,137 @@
+import argparse
+import itertools
+import math
+import multiprocessing
+import random
+import typing
+
+from color import Color
+from engine import Game
+import record
+
+# A policy gets the game and an RNG reserved for its own decisions and returns the cell to play.
+# Policies are sent to worker processes, so they must be picklable (module-level functions or
+# instances of module-level classes).
+Policy = typing.Callable[[Game, random.Random], tuple[int,int]]
+
+class GameTask(typing.NamedTuple):
+    index: int
+    black: str
+    white: str
+    flip_prob: float
+    flip_seed: int
+    policy_seed: int
+    keep_record: bool
+
+class GameResult(typing.NamedTuple):
+    index: int
+    black: str
+    white: str
+    winner: None|Color
+    moves: int
+    flip_seed: int
+    record: None|bytes  # the game encoded by record.encodeGame, if requested
+
+def randomPolicy(game: Game, rng: random.Random):
+    # any empty cell of the board the players can see
+    board = game.fake_board
+    return rng.choice(list(board.cells(board.empty())))
+
+def playGame(black: Policy, white: Policy, flip_prob: float, flip_seed: int, policy_seed: int):
+    game = Game(flip_seed)
+    game.flip_prob = flip_prob
+    policy_rng = random.Random(policy_seed)
+    # search players drop what they learned in earlier games, so a game's moves only depend on its seeds
+    for policy in (black, white):
+        if hasattr(policy, "newGame"):
+            policy.newGame()
+
+    while game.winner is None and len(game.history) < game.SIZE*game.SIZE:
+        policy = black if game.current_color == Color.BLACK else white
+        x, y = policy(game, policy_rng)
+        game.play(x, y)
+
+    return game
+
+def makeTasks(names: list[str], games_per_pair: int, flip_prob: float, master_seed: int, keep_records: bool):
+    # Seeds are drawn per game index from the master seed, so the results do not depend on
+    # how the tasks are spread over workers or in which order they finish.
+    seeds = random.Random(master_seed)
+    index = 0
+    for black, white in itertools.permutations(names, 2):
+        for _ in range(games_per_pair):
+            yield GameTask(index, black, white, flip_prob, seeds.getrandbits(64), seeds.getrandbits(64), keep_records)
+            index += 1
+
+_worker_policies: dict[str, Policy] = {}
+
+def _initWorker(policies: dict[str, Policy]):
+    global _worker_policies
+    _worker_policies = policies
+
+def _runTask(task: GameTask):
+    game = playGame(_worker_policies[task.black], _worker_policies[task.white],
+                    task.flip_prob, task.flip_seed, task.policy_seed)
+    encoded = record.encodeGame(game) if task.keep_record else None
+    return GameResult(task.index, task.black, task.white, game.winner, len(game.history), task.flip_seed, encoded)
+
+def runTournament(policies: dict[str, Policy], games_per_pair: int, flip_prob: float = 0.1,
+                  master_seed: int = 0, processes: None|int = None, chunksize: int = 4,
+                  keep_records: bool = False) -> typing.Iterator[GameResult]:
+    # Plays every ordered pair of policies games_per_pair times and yields results as they finish.
+    # Results arrive out of order; sort by GameResult.index for a canonical listing.
+    if len(policies) == 1:
+        (name, policy), = policies.items()
+        policies = {name: policy, name + "'": policy}
+
+    tasks = makeTasks(list(policies), games_per_pair, flip_prob, master_seed, keep_records)
+    with multiprocessing.Pool(processes, initializer=_initWorker, initargs=(policies,)) as pool:
+        yield from pool.imap_unordered(_runTask, tasks, chunksize)
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play tournament between RandGomoku policies")
+    parser.add_argument("--games", type=int, default=10, help="games per ordered pair of policies")
+    parser.add_argument("--flip-prob", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--record", metavar="FILE", help="append every game to this record file")
+    parser.add_argument("--players", nargs="+", default=["random"], choices=["random", "expectimax", "mcts"],
+                        help="policies taking part")
+    # search players are limited by work rather than time, so results do not depend on the machine or load
+    parser.add_argument("--depth", type=int, default=2, help="search depth of the expectimax player")
+    parser.add_argument("--playouts", type=int, default=200, help="playouts per move of the MCTS player")
+    args = parser.parse_args()
+
+    policies: dict[str, Policy] = {}
+    for name in args.players:
+        if name == "random":
+            policies[name] = randomPolicy
+        elif name == "expectimax":
+            from ai import ExpectimaxPlayer
+            policies[name] = ExpectimaxPlayer(math.inf, max_depth=args.depth)
+        elif name == "mcts":
+            from mcts import MCTSPlayer
+            policies[name] = MCTSPlayer(math.inf, playouts=args.playouts)
+
+    wins: dict[str, int] = {}
+    draws = 0
+    writer = record.RecordWriter(args.record) if args.record else None
+    for result in runTournament(policies, args.games, args.flip_prob, args.seed, args.processes,
+                                keep_records=writer is not None):
+        if writer and result.record:
+            writer.writeEncoded(result.record)
+        if result.winner is None:
+            draws += 1
+        else:
+            name = result.black if result.winner == Color.BLACK else result.white
+            wins[name] = wins.get(name, 0) + 1
+
+    if writer:
+        writer.close()
+
+    for name, count in sorted(wins.items()):
+        print(f"{name}: {count} wins")
+    print(f"draws: {draws}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import typing
+
+from color import Color
+
+class Variation:
+    # One node of a game's variation tree: the position after the move with code (a history.py
+    # move code), reached from parent. A line of play is the path from the root to a node, so
+    # lines that begin with the same moves share those nodes and a line that is left for another
+    # one stays in the tree, costing one node per move that differs. selected is the child the
+    # line went on with last, where redo goes.
+
+    __slots__ = ("code", "parent", "children", "selected", "depth", "winner")
+
+    def __init__(self, code: int = -1, parent: "None|Variation" = None):
+        self.code = code
+        self.parent = parent
+        self.children: list[Variation] = []
+        self.selected: None|Variation = None
+        self.depth = parent.depth + 1 if parent is not None else 0
+        # who had five once the move was played, if anyone
+        self.winner: None|Color = None
+
+    def child(self, code: int):
+        # the child for the move with code, added if the tree does not have it yet, and selected
+        for child in self.children:
+            if child.code == code:
+                break
+        else:
+            child = Variation(code, self)
+            self.children.append(child)
+        self.selected = child
+        return child
+
+    def path(self, ancestor: "None|Variation" = None):
+        # the nodes after ancestor (the root by default) down to this one
+        nodes = []
+        node = self
+        while node is not ancestor and node.parent is not None:
+            nodes.append(node)
+            node = node.parent
+        nodes.reverse()
+        return nodes
+
+    def continuation(self) -> typing.Iterator["Variation"]:
+        # the nodes after this one along the selected children
+        node = self.selected
+        while node is not None:
+            yield node
+            node = node.selected
+
+def commonAncestor(a: Variation, b: Variation) -> None|Variation:
+    # None when a and b are in different trees
+    while a.depth > b.depth:
+        a = typing.cast(Variation, a.parent)
+    while b.depth > a.depth:
+        b = typing.cast(Variation, b.parent)
+    while a is not b:
+        if a.parent is None:
+            return None
+        a, b = a.parent, typing.cast(Variation, b.parent)
+    return a
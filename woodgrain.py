@@ -0,0 +1,134 @@
+import glob
+import os
+import typing
+
+# Wood-grain board texture. The height field of testWoodGrain.py (a sum of exponential decays
+# around random points) is computed with NumPy one block of pixels at a time. Points further than
+# CUTOFF_DECAYS decay lengths from a block contribute nothing visible and are skipped, so the
+# work and the memory per block stay bounded at any image size. Ring bands of the field and fine
+# fibers along the grain are then mapped onto wood colors.
+#
+# The board uses a square texture of one of TEXTURE_SIZES, the smallest that covers the view in
+# physical pixels, so the grain is never stretched on large or high-DPI screens while resizing
+# only switches texture when a bucket is crossed. Textures are generated off the GUI thread and
+# cached compressed, at most MAX_CACHE_ENTRIES files.
+#
+# NumPy is only imported when a texture is generated; texture() returns None without it, so the
+# board can fall back to its flat color.
+
+TEXTURE_VERSION = 2
+TEXTURE_SIZES = (1024, 2048, 4096)
+MAX_CACHE_ENTRIES = 4
+CUTOFF_DECAYS = 8
+# pixels per side of the blocks the height field is computed in
+BLOCK_SIZE = 128
+
+LIGHT = (236, 182, 70)
+DARK = (196, 128, 22)
+
+def textureSize(pixels: float):
+    # the smallest texture size covering pixels, or the largest one
+    for size in TEXTURE_SIZES:
+        if size >= pixels:
+            return size
+    return TEXTURE_SIZES[-1]
+
+def cacheDirectory():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "randgomoku")
+
+def heightField(width: int, height: int, points, decay: float, stretch: float):
+    # sum over points of exp(-d/decay), with distances along x divided by stretch so the
+    # features are elongated along the grain
+    import numpy as np
+
+    field = np.zeros((height, width), dtype=np.float32)
+    cutoff = CUTOFF_DECAYS * decay
+
+    for top in range(0, height, BLOCK_SIZE):
+        bottom = min(height, top+BLOCK_SIZE)
+        for left in range(0, width, BLOCK_SIZE):
+            right = min(width, left+BLOCK_SIZE)
+            # distance from each point to the block, in the same stretched metric
+            gap_x = np.maximum(np.maximum(left - points[:, 0], points[:, 0] - (right-1)), 0) / stretch
+            gap_y = np.maximum(np.maximum(top - points[:, 1], points[:, 1] - (bottom-1)), 0)
+            near = points[gap_x*gap_x + gap_y*gap_y < cutoff*cutoff]
+            if not len(near):
+                continue
+            xs = np.arange(left, right, dtype=np.float32)
+            ys = np.arange(top, bottom, dtype=np.float32)
+            dx = (xs[None, :, None] - near[None, None, :, 0]) / stretch
+            dy = ys[:, None, None] - near[None, None, :, 1]
+            distance = np.sqrt(dx*dx + dy*dy)
+            field[top:bottom, left:right] = np.exp(-distance / decay).sum(axis=2)
+    return field
+
+def generate(width: int, height: int, seed: int = 0, n_points: None|int = None,
+             decay: None|float = None, stretch: float = 6.0, rings: float = 5.0):
+    # returns a (height, width, 3) uint8 RGB array
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    # the look should not depend on the resolution, so densities scale with the image
+    scale = max(width, height)
+    decay = decay if decay is not None else scale / 12
+    n_points = n_points if n_points is not None else 40
+    points = (rng.random((n_points, 2)) * [width, height]).astype(np.float32)
+
+    field = heightField(width, height, points, decay, stretch)
+    field /= max(float(field.max()), 1e-6)
+    shade = 0.5 + 0.5*np.sin(2*np.pi*rings*field)
+
+    # fibers: per-row noise smoothed across rows and gently varying along the grain
+    fibers = rng.standard_normal(height + 4).astype(np.float32)
+    fibers = np.convolve(fibers, np.ones(5, dtype=np.float32)/5, mode="valid")[:height]
+    wobble = np.sin(np.linspace(0, 2*np.pi*rng.uniform(1, 3), width, dtype=np.float32) + rng.uniform(0, 2*np.pi))
+    shade = np.clip(0.75*shade + 0.25*(0.5 + 0.3*fibers[:, None] + 0.1*wobble[None, :]), 0, 1)
+
+    light = np.array(LIGHT, dtype=np.float32)
+    dark = np.array(DARK, dtype=np.float32)
+    image = dark + (light-dark) * shade[:, :, None]
+    return np.ascontiguousarray(image.astype(np.uint8))
+
+def texture(size: int = TEXTURE_SIZES[0], seed: int = 0, cache_dir: None|str = None) -> typing.Any:
+    # size x size RGB array, loaded from the disk cache if it was generated before; None when
+    # NumPy is not available. Safe to call from a background thread.
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    cache_dir = cache_dir if cache_dir is not None else cacheDirectory()
+    path = os.path.join(cache_dir, f"wood-v{TEXTURE_VERSION}-{seed}-{size}.npz")
+    try:
+        with np.load(path) as archive:
+            image = archive["image"]
+        if image.shape == (size, size, 3) and image.dtype == np.uint8:
+            return image
+    except (OSError, ValueError, KeyError):
+        pass
+
+    image = generate(size, size, seed)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write then rename, so a concurrent reader never sees half a file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez_compressed(file, image=image)
+        os.replace(temporary, path)
+        pruneCache(cache_dir)
+    except OSError:
+        pass
+    return image
+
+def pruneCache(cache_dir: str, keep: int = MAX_CACHE_ENTRIES):
+    # removes textures of other versions and all but the newest keep of this one
+    current = f"wood-v{TEXTURE_VERSION}-"
+    paths = sorted(glob.glob(os.path.join(cache_dir, "wood-v*")), key=os.path.getmtime, reverse=True)
+    stale = [path for path in paths if not os.path.basename(path).startswith(current)]
+    stale += [path for path in paths if os.path.basename(path).startswith(current)][keep:]
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
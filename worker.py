@@ -0,0 +1,74 @@
+import sys
+import traceback
+import typing
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+if typing.TYPE_CHECKING:
+    import concurrent.futures
+
+_generation = None
+
+def _initProcess(generation):
+    global _generation
+    _generation = generation
+
+def _runJob(function: typing.Callable, args: tuple, generation: int):
+    return function(*args, should_stop=lambda: _generation.value != generation)
+
+class EngineWorker(QObject):
+    # Runs analysis jobs (see analysis.py) in a separate process so the GUI thread never blocks on
+    # them. Every request or cancel() bumps a generation counter shared with the process: a running
+    # job sees the change and stops early, and results of stale requests are dropped instead of
+    # being delivered through result_ready.
+
+    result_ready = pyqtSignal(str, object)
+    job_finished = pyqtSignal(str, int, object)
+
+    def __init__(self):
+        super().__init__()
+        # the counter, the process and their modules are only set up by the first request
+        self.generation: typing.Any = None
+        self.executor: "None|concurrent.futures.ProcessPoolExecutor" = None
+        # done callbacks run on an executor thread; the queued signal brings results back to ours
+        self.job_finished.connect(self.deliver)
+
+    def request(self, kind: str, function: typing.Callable, *args):
+        # function(*args, should_stop=...) runs in the worker process; its result arrives as
+        # result_ready(kind, result) unless another request or cancel() comes first
+        if self.executor is None:
+            import concurrent.futures
+            import multiprocessing
+            if self.generation is None:
+                self.generation = multiprocessing.RawValue("i", 0)
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                1, initializer=_initProcess, initargs=(self.generation,))
+
+        self.cancel()
+        generation = self.generation.value
+        future = self.executor.submit(_runJob, function, args, generation)
+        future.add_done_callback(lambda future: self.onDone(kind, generation, future))
+
+    def cancel(self):
+        if self.generation is not None:
+            self.generation.value += 1
+
+    def onDone(self, kind: str, generation: int, future: "concurrent.futures.Future"):
+        if future.cancelled():
+            return
+        error = future.exception()
+        self.job_finished.emit(kind, generation, error if error is not None else future.result())
+
+    def deliver(self, kind: str, generation: int, result: object):
+        if generation != self.generation.value:
+            return
+        if isinstance(result, BaseException):
+            traceback.print_exception(result, file=sys.stderr)
+            return
+        self.result_ready.emit(kind, result)
+
+    def shutdown(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
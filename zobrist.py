@@ -0,0 +1,101 @@
+import functools
+import random
+
+from color import Color
+
+ZOBRIST_SEED = 0x52616e64476f6d6f
+
+@functools.lru_cache(maxsize=None)
+def zobristKeys(size: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    # one random 64-bit key per color per cell (x*size+y); fixed seed so hashes are stable across runs
+    rng = random.Random(ZOBRIST_SEED ^ size)
+    return tuple(tuple(rng.getrandbits(64) for _ in range(size*size)) for _ in Color)
+
+# XORed into a board hash when white is to move, for tables that need the side to move in the key
+SIDE_TO_MOVE_KEY = random.Random(ZOBRIST_SEED).getrandbits(64)
+
+@functools.lru_cache(maxsize=None)
+def symmetries(size: int) -> tuple[tuple[int, ...], ...]:
+    # The eight symmetries of the board (the dihedral group D4: four rotations, each optionally
+    # mirrored) as permutations of cell indices, the identity first: symmetries(size)[t][cell] is
+    # where symmetry t moves cell.
+    n = size - 1
+    maps = (lambda x, y: (x, y), lambda x, y: (n-y, x), lambda x, y: (n-x, n-y), lambda x, y: (y, n-x),
+            lambda x, y: (y, x), lambda x, y: (n-x, y), lambda x, y: (x, n-y), lambda x, y: (n-y, n-x))
+    result = []
+    for transform in maps:
+        permutation = []
+        for cell in range(size*size):
+            x, y = transform(*divmod(cell, size))
+            permutation.append(x*size + y)
+        result.append(tuple(permutation))
+    return tuple(result)
+
+@functools.lru_cache(maxsize=None)
+def inverseSymmetries(size: int) -> tuple[tuple[int, ...], ...]:
+    # inverseSymmetries(size)[t] undoes symmetries(size)[t]
+    result = []
+    for permutation in symmetries(size):
+        inverse = [0] * len(permutation)
+        for cell, image in enumerate(permutation):
+            inverse[image] = cell
+        result.append(tuple(inverse))
+    return tuple(result)
+
+@functools.lru_cache(maxsize=None)
+def symmetricZobristKeys(size: int) -> tuple[tuple[tuple[int, ...], tuple[int, ...]], ...]:
+    # per symmetry t, the zobristKeys of the cells symmetry t moves each cell to: XORing these
+    # for every stone hashes the transformed board, so a game can keep all eight hashes
+    # incrementally and the smallest of them is the same for every symmetric position
+    keys = zobristKeys(size)
+    return tuple(tuple(tuple(color_keys[image] for image in permutation) for color_keys in keys)
+                 for permutation in symmetries(size))
+
+class TranspositionEntry:
+    __slots__ = ("key", "depth", "value", "flag", "move", "generation")
+
+    def __init__(self, key: int, depth: int, value: float, flag: int, move: None|int|tuple[int,int], generation: int):
+        self.key = key
+        self.depth = depth
+        self.value = value
+        self.flag = flag
+        self.move = move
+        self.generation = generation
+
+class TranspositionTable:
+    # Fixed number of slots indexed by key. A stored entry replaces the one in its slot if the slot
+    # is free, holds the same position, was written during an older search, or was searched less
+    # deeply; otherwise the deeper entry from the current search is kept.
+
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+
+    def __init__(self, capacity: int = 1 << 18):
+        self.capacity = capacity
+        self.slots: list[None|TranspositionEntry] = [None] * capacity
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def newSearch(self):
+        # entries from earlier searches become preferred victims for replacement
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * self.capacity
+        self.generation = 0
+
+    def get(self, key: int) -> None|TranspositionEntry:
+        entry = self.slots[key % self.capacity]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: float, flag: int, move: None|int|tuple[int,int] = None):
+        index = key % self.capacity
+        entry = self.slots[index]
+        if entry is None or entry.key == key or entry.generation != self.generation or depth >= entry.depth:
+            self.slots[index] = TranspositionEntry(key, depth, value, flag, move, self.generation)